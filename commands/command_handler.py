@@ -1,8 +1,56 @@
+import sys
 import time
+from config import config
 from logger import logger
 from utils.input_handler import InputHandler
 
 
+# Conversation history paging
+HISTORY_PAGE_SIZE = 20
+HISTORY_PREVIEW_LENGTH = 100
+
+# Rough characters-per-token estimate used to fit summaries into the model context
+SUMMARY_CHARS_PER_TOKEN = 3.5
+
+# Display lookups shared by the listing commands (module constants)
+_ROLE_EMOJI = {
+    'user': '👤',
+    'assistant': '🤖',
+    'tool': '🔧',
+    'system': '⚙️'
+}
+_DEFAULT_EMOJI = '❓'
+STATUS = {True: "⚪ Ended", False: "🟢 Active"}
+
+
+def _short_ts(ts) -> str:
+    """Format a stored timestamp as 'YYYY-MM-DD HH:MM:SS', or 'Unknown' if missing"""
+    return ts[:19] if ts else 'Unknown'
+
+
+def _format_conversation_row(i, conv: dict, include_summary_flag: bool) -> str:
+    """
+    Format one conversation for the listing commands
+    
+    Args:
+        i: 1-based position in the list (None to omit the number)
+        conv: Conversation dictionary from get_recent_conversations
+        include_summary_flag: Whether to show if the conversation has a summary
+        
+    Returns:
+        Multi-line display string
+    """
+    number = f"{i:2d}. " if i is not None else ""
+    indent = "     " if i is not None else "   "
+    summary = f"{'✅' if conv.get('summary') else '❌'} Summary | " if include_summary_flag else ""
+    return "\n".join((
+        f"{number}ID: {conv['id']} | {STATUS[bool(conv['ended_at'])]} | {summary}{_short_ts(conv['started_at'])}",
+        f"{indent}📄 {conv.get('title') or 'Untitled Conversation'}",
+        f"{indent}💬 {conv.get('message_count') or 0} messages",
+        ""
+    ))
+
+
 class CommandHandler:
     """Handle user commands and system operations"""
     
@@ -11,32 +59,28 @@ class CommandHandler:
         self.message_embeddings = message_embeddings
         self.input_handler = input_handler
         self.model = model
+        
+        # Command name -> handler; every handler accepts the raw input line
+        self._dispatch = {
+            'help': self._show_help,
+            'clear': self._clear_conversation_history,
+            'history': self._show_conversation_history,
+            'conversations': self._show_recent_conversations,
+            'stats': self._show_conversation_stats,
+            'search': self._search_similar_messages,
+            'embeddings': self._show_embedding_stats,
+            'rebuild': self._rebuild_message_index,
+            'summarise_conv': self._summarise_conversation,
+            'exit': self._handle_exit,
+        }
     
     def handle_command(self, action: str, full_input: str = None):
         """Route commands to appropriate handlers"""
-        if action == 'help':
-            self._show_help()
-        elif action == 'clear':
-            self._clear_conversation_history()
-        elif action == 'history':
-            self._show_conversation_history()
-        elif action == 'conversations':
-            self._show_recent_conversations()
-        elif action == 'stats':
-            self._show_conversation_stats()
-        elif action == 'search':
-            self._search_similar_messages()
-        elif action == 'embeddings':
-            self._show_embedding_stats()
-        elif action == 'rebuild':
-            self._rebuild_message_index()
-        elif action == 'summarise_conv':
-            self._summarise_conversation(full_input)
-        elif action == 'exit':
-            return self._handle_exit()
-        else:
+        handler = self._dispatch.get(action)
+        if handler is None:
             print(f"❌ Unknown command: {action}")
             return None
+        return handler(full_input)
     
     def handle_invalid_input(self, input_data: dict):
         """Handle invalid input and provide user feedback"""
@@ -44,13 +88,13 @@ class CommandHandler:
         print(feedback)
         return None
     
-    def _show_help(self):
+    def _show_help(self, full_input: str = None):
         """Show help text with all available commands"""
         help_text = self.input_handler.get_help_text()
         # Add conversation commands to help
         help_text += "\n\nConversation Commands:"
         help_text += "\n  exit, quit, bye - Exit the application"
-        help_text += "\n  history - Show recent conversation history"
+        help_text += "\n  history [page] - Show conversation history, one page at a time"
         help_text += "\n  conversations - List recent conversations"
         help_text += "\n  stats - Show conversation statistics"
         help_text += "\n  search - Search for similar messages"
@@ -60,45 +104,57 @@ class CommandHandler:
         print(help_text)
         logger.log_system_event("help_requested", "User requested help")
     
-    def _clear_conversation_history(self):
+    def _clear_conversation_history(self, full_input: str = None):
         """Clear the current conversation history"""
         if self.model and hasattr(self.model, 'conversation_history'):
             self.model.conversation_history.clear()
         print("🧹 Conversation history cleared!")
         logger.log_system_event("history_cleared", "User cleared conversation history")
     
-    def _show_conversation_history(self):
-        """Show current conversation history"""
+    def _show_conversation_history(self, full_input: str = None):
+        """Show one page of the current conversation history ('history N' for page N)"""
         try:
-            history = self.conversation_history.get_conversation_history(limit=20)
+            page = 1
+            if full_input:
+                parts = full_input.strip().split()
+                if len(parts) >= 2:
+                    try:
+                        page = max(1, int(parts[1]))
+                    except ValueError:
+                        print(f"❌ Invalid page number: '{parts[1]}'. Must be a number.")
+                        return
+            
+            history = self.conversation_history.get_conversation_history(
+                limit=HISTORY_PAGE_SIZE,
+                offset=(page - 1) * HISTORY_PAGE_SIZE,
+                preview_len=HISTORY_PREVIEW_LENGTH
+            )
             
             if not history:
-                print("📝 No conversation history found.")
+                print("📝 No conversation history found." if page == 1 else f"📝 No messages on page {page}.")
                 return
             
-            print(f"📝 Current Conversation History ({len(history)} messages):")
+            print(f"📝 Current Conversation History - Page {page} ({len(history)} messages):")
             print("-" * 50)
             
             for msg in history:
-                timestamp = msg['created_at'][:19] if msg['created_at'] else 'Unknown'
-                role_emoji = {
-                    'user': '👤',
-                    'assistant': '🤖', 
-                    'tool': '🔧',
-                    'system': '⚙️'
-                }.get(msg['role'], '❓')
+                timestamp = _short_ts(msg['created_at'])
+                role_emoji = _ROLE_EMOJI.get(msg['role'], _DEFAULT_EMOJI)
                 
-                content = msg['content'][:100] + "..." if len(msg['content']) > 100 else msg['content']
+                content = msg['content'] + "..." if msg.get('truncated') else msg['content']
                 print(f"{role_emoji} [{timestamp}] {content}")
                 
                 if msg['tool_name']:
                     print(f"   🔧 Tool: {msg['tool_name']}")
+            
+            if len(history) == HISTORY_PAGE_SIZE:
+                print(f"\nPage {page} — type 'history {page + 1}' for next")
                     
         except Exception as e:
             print(f"❌ Error retrieving history: {e}")
             logger.log_error("history_display_failed", str(e), "Failed to display conversation history")
     
-    def _show_recent_conversations(self):
+    def _show_recent_conversations(self, full_input: str = None):
         """Show recent conversations summary"""
         try:
             conversations = self.conversation_history.get_recent_conversations(limit=10)
@@ -110,21 +166,13 @@ class CommandHandler:
             print(f"📝 Recent Conversations ({len(conversations)}):")
             print("-" * 50)
             
-            for conv in conversations:
-                started = conv['started_at'][:19] if conv['started_at'] else 'Unknown'
-                status = "🟢 Active" if not conv['ended_at'] else "⚪ Ended"
-                message_count = conv['message_count'] or 0
-                
-                print(f"ID: {conv['id']} | {status} | {started}")
-                print(f"   📄 {conv['title']}")
-                print(f"   💬 {message_count} messages")
-                print()
+            print("\n".join(_format_conversation_row(None, conv, False) for conv in conversations))
                 
         except Exception as e:
             print(f"❌ Error retrieving conversations: {e}")
             logger.log_error("conversations_display_failed", str(e), "Failed to display conversations")
     
-    def _show_conversation_stats(self):
+    def _show_conversation_stats(self, full_input: str = None):
         """Show conversation analytics"""
         try:
             stats = self.conversation_history.get_conversation_analytics()
@@ -146,7 +194,7 @@ class CommandHandler:
             print(f"❌ Error retrieving statistics: {e}")
             logger.log_error("stats_display_failed", str(e), "Failed to display conversation statistics")
     
-    def _search_similar_messages(self):
+    def _search_similar_messages(self, full_input: str = None):
         """Search for similar messages interactively"""
         try:
             search_query = input("🔍 Enter search query: ").strip()
@@ -171,9 +219,9 @@ class CommandHandler:
             
             for i, msg in enumerate(similar_messages, 1):
                 similarity = msg.get('similarity_score', 0)
-                role_emoji = {'user': '👤', 'assistant': '🤖'}.get(msg['role'], '❓')
+                role_emoji = _ROLE_EMOJI.get(msg['role'], _DEFAULT_EMOJI)
                 conv_title = msg.get('conversation_title', 'Unknown')
-                created_at = msg.get('created_at', 'Unknown')[:19]
+                created_at = _short_ts(msg.get('created_at'))
                 
                 content = msg['original_content'][:150] + "..." if len(msg['original_content']) > 150 else msg['original_content']
                 
@@ -185,7 +233,7 @@ class CommandHandler:
             print(f"❌ Error searching messages: {e}")
             logger.log_error("message_search_failed", str(e), "Failed to search similar messages")
     
-    def _show_embedding_stats(self):
+    def _show_embedding_stats(self, full_input: str = None):
         """Show message embedding statistics"""
         try:
             stats = self.message_embeddings.get_index_statistics()
@@ -220,7 +268,7 @@ class CommandHandler:
             print(f"❌ Error retrieving embedding stats: {e}")
             logger.log_error("embedding_stats_failed", str(e), "Failed to display embedding statistics")
     
-    def _rebuild_message_index(self):
+    def _rebuild_message_index(self, full_input: str = None):
         """Rebuild the message embedding index"""
         try:
             print("🔄 Rebuilding message embedding index...")
@@ -282,17 +330,9 @@ class CommandHandler:
                 print("📝 Recent Conversations:")
                 print("-" * 50)
                 
-                for i, conv in enumerate(conversations, 1):
-                    started = conv['started_at'][:19] if conv['started_at'] else 'Unknown'
-                    status = "🟢 Active" if not conv['ended_at'] else "⚪ Ended"
-                    message_count = conv.get('message_count', 0)
-                    title = conv.get('title', 'Untitled Conversation')
-                    has_summary = "✅" if conv.get('summary') else "❌"
-                    
-                    print(f"{i:2d}. ID: {conv['id']} | {status} | {has_summary} Summary | {started}")
-                    print(f"     📄 {title}")
-                    print(f"     💬 {message_count} messages")
-                    print()
+                print("\n".join(
+                    _format_conversation_row(i, conv, True) for i, conv in enumerate(conversations, 1)
+                ))
                 
                 # Get user choice
                 while True:
@@ -330,7 +370,10 @@ class CommandHandler:
             
             # Fetch conversation data
             print(f"📊 Fetching conversation data for ID {conv_id}...")
-            conversation_data = self.conversation_history.get_conversation_for_summary(conv_id)
+            conversation_data = self.conversation_history.get_conversation_for_summary(
+                conv_id,
+                max_chars=int(config.model.context_size * SUMMARY_CHARS_PER_TOKEN)
+            )
             
             if not conversation_data['messages']:
                 print("❌ No messages found in this conversation")
@@ -342,8 +385,15 @@ class CommandHandler:
             print(f"📈 Found {message_count} messages and {tool_count} tool uses")
             print("🧠 Generating AI summary...")
             
-            # Generate summary using the model
-            summary_result = self.model.summarize_conversation(conversation_data)
+            # Stream the summary as it is generated, then add title and tool usage
+            summary_parts = []
+            for chunk in self.model.summarize_conversation_stream(conversation_data):
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+                summary_parts.append(chunk)
+            print()
+            
+            summary_result = self.model.finish_conversation_summary(conversation_data, "".join(summary_parts))
             
             # Display generated summary
             print("\n" + "="*60)
@@ -381,7 +431,7 @@ class CommandHandler:
             print(f"❌ Error during summarization: {e}")
             logger.log_error("conversation_summarization_failed", str(e), "User-initiated conversation summarization failed")
     
-    def _handle_exit(self):
+    def _handle_exit(self, full_input: str = None):
         """Handle exit command and return exit status"""
         # End current conversation before exiting
         self.conversation_history.end_current_conversation("User ended session")
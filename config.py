@@ -12,6 +12,8 @@ class DatabaseConfig:
     database: str = "local_assistant"
     user: str = "postgres"
     password: Optional[str] = None
+    min_connections: int = 2
+    max_connections: int = 8
     
     def __post_init__(self):
         self.host = os.getenv("PG_HOST", self.host)
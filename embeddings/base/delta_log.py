@@ -0,0 +1,123 @@
+"""
+Append-only log of index additions replayed on top of the last full snapshot
+"""
+
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+# Each record is a header (JSON length, CRC32 of the payload) followed by the payload:
+# one float32 vector and its mapping row as UTF-8 JSON. A vector and its row are
+# therefore always written, and lost, together.
+RECORD_HEADER = struct.Struct('<II')
+
+
+def encode_records(vectors: np.ndarray, rows: List[Dict]) -> bytes:
+    """
+    Serialize vectors and their mapping rows as delta log records
+
+    Args:
+        vectors: float32 vectors, shape (len(rows), d)
+        rows: Mapping rows in the same order as the vectors
+
+    Returns:
+        The records as one byte string
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if len(vectors) != len(rows):
+        raise ValueError(f"Got {len(vectors)} vectors for {len(rows)} rows")
+
+    parts = []
+    for vector, row in zip(vectors, rows):
+        payload = vector.tobytes() + json.dumps(row, default=str).encode('utf-8')
+        parts.append(RECORD_HEADER.pack(len(payload) - vector.nbytes, zlib.crc32(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def append_records(path: Path, vectors: np.ndarray, rows: List[Dict]):
+    """
+    Append records to the log with a single fsynced write
+
+    If the write fails the file is truncated back to its previous size so a
+    later append never lands behind a partial record.
+
+    Args:
+        path: Delta log file
+        vectors: float32 vectors, shape (len(rows), d)
+        rows: Mapping rows in the same order as the vectors
+    """
+    data = encode_records(vectors, rows)
+    with open(path, 'ab') as f:
+        start = f.seek(0, os.SEEK_END)
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(start)
+            raise
+
+
+def read_records(path: Path, dimension: int) -> Tuple[np.ndarray, List[Dict], int]:
+    """
+    Read the complete, intact records from the start of the log
+
+    Reading stops at the first truncated or corrupt record; everything after it
+    is unusable because record boundaries can no longer be trusted.
+
+    Args:
+        path: Delta log file
+        dimension: Vector dimension
+
+    Returns:
+        (vectors of shape (n, dimension), n mapping rows, byte length of the valid prefix)
+    """
+    data = Path(path).read_bytes()
+    vector_bytes = dimension * 4
+    vectors, rows = [], []
+    offset = 0
+
+    while offset + RECORD_HEADER.size <= len(data):
+        json_length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + vector_bytes + json_length
+        if end > len(data):
+            break
+        payload = data[start:end]
+        if zlib.crc32(payload) != checksum:
+            break
+        try:
+            row = json.loads(payload[vector_bytes:].decode('utf-8'))
+        except ValueError:
+            break
+
+        vectors.append(np.frombuffer(payload, dtype=np.float32, count=dimension))
+        rows.append(row)
+        offset = end
+
+    if not vectors:
+        return np.empty((0, dimension), dtype=np.float32), rows, offset
+    return np.vstack(vectors), rows, offset
+
+
+def truncate_to(path: Path, length: int) -> bool:
+    """
+    Cut the log back to its valid prefix
+
+    Args:
+        path: Delta log file
+        length: Byte length of the valid prefix, as returned by read_records
+
+    Returns:
+        True if a damaged tail was removed
+    """
+    if os.path.getsize(path) <= length:
+        return False
+    os.truncate(path, length)
+    return True
@@ -2,14 +2,77 @@
 Base embedding manager with common functionality
 """
 
+import hashlib
 from abc import ABC, abstractmethod
-from sentence_transformers import SentenceTransformer
-from embeddings.base.faiss_persistence import FaissPersistenceManager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from embeddings.base.faiss_persistence import FaissPersistenceManager, index_qtype
 from embeddings.config import EmbeddingConfig
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Any
 import numpy as np
 import faiss
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+# FAISS warns below 39 points per centroid; PQ codebooks have 256 centroids
+PQ_MIN_TRAINING_VECTORS = 39 * 256
+
+# Scalar quantizer per quantization setting: fp16 halves memory losslessly for
+# normalized vectors, sq8 quarters it with a small recall cost
+SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _select_device() -> str:
+    """Pick the fastest available torch device for encoding"""
+    import torch
+    
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+@lru_cache(maxsize=None)
+def _set_torch_threads(num_threads: int):
+    """Set torch's intra-op thread count (process-wide, applied once per value)"""
+    import torch
+    
+    torch.set_num_threads(num_threads)
+
+
+def _inference_mode():
+    """Context manager disabling autograd tracking for encoder calls"""
+    import torch
+    
+    return torch.inference_mode()
+
+
+@lru_cache(maxsize=4)
+def _get_model(name: str, device: str, half: bool = False, max_seq_length: Optional[int] = None) -> "SentenceTransformer":
+    """
+    Load a SentenceTransformer once per (name, device, half, max_seq_length) and share it between managers
+    
+    Sharing is thread-safe for inference: encode() allocates its own tensors per
+    call and never mutates the model weights. torch and sentence-transformers are
+    imported here so that loading a manager does not pay for them up front.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    model = SentenceTransformer(name, device=device, model_kwargs={"torch_dtype": torch.float32})
+    if half:
+        model.half()
+    if max_seq_length:
+        model.max_seq_length = max_seq_length
+    return model
+
 
 class BaseEmbeddingManager(ABC):
     """Base class for embedding managers with common functionality"""
@@ -24,10 +87,44 @@ class BaseEmbeddingManager(ABC):
             config: Configuration object
         """
         self.config = config or EmbeddingConfig()
-        self.embedding_model = SentenceTransformer(embedding_model_name)
-        self.persistence_manager = FaissPersistenceManager(index_dir)
+        # The model is loaded on first encode, not here (see embedding_model)
+        self._model_name = embedding_model_name
+        self._device = self.config.device
+        self.persistence_manager = FaissPersistenceManager(
+            index_dir,
+            mmap=self.config.mmap,
+            validation_ttl_seconds=self.config.index_validation_ttl
+        )
         self.index: Optional[faiss.Index] = None
         self.mapping: Dict[int, Dict] = {}
+        # Per-instance LRU of query vectors keyed by a digest of the query string
+        self._query_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+    
+    @property
+    def device(self) -> str:
+        """Torch device used for bulk encoding (auto-selected on first use)"""
+        if self._device is None:
+            self._device = _select_device()
+        return self._device
+    
+    @property
+    def embedding_model(self) -> "SentenceTransformer":
+        """Model used for bulk encoding, loaded on first access (fp16 on CUDA when enabled)"""
+        use_fp16 = self.config.encode_fp16 and self.device == "cuda"
+        if self.config.torch_num_threads:
+            _set_torch_threads(self.config.torch_num_threads)
+        return _get_model(self._model_name, self.device, use_fp16, self.config.max_seq_length)
+    
+    @property
+    def query_model(self) -> "SentenceTransformer":
+        """
+        Model used for single queries, loaded on first access
+        
+        Single queries are latency-bound; a CPU copy avoids host/GPU round trips per query.
+        """
+        if self.config.query_on_cpu and self.device != "cpu":
+            return _get_model(self._model_name, "cpu", False, self.config.max_seq_length)
+        return self.embedding_model
     
     @abstractmethod
     def _build_index(self, vectors: np.ndarray, mapping: Dict[int, Dict]) -> faiss.Index:
@@ -39,14 +136,246 @@ class BaseEmbeddingManager(ABC):
         """Search index with query vector"""
         pass
     
-    def _create_empty_index(self, dimension: int) -> faiss.Index:
-        """Create an empty FAISS index with given dimension"""
-        return faiss.IndexFlatL2(dimension)
+    def _create_empty_index(self, dimension: int, expected_size: int = 0) -> faiss.Index:
+        """
+        Create an empty inner-product FAISS index (cosine on normalized vectors)
+        
+        Args:
+            dimension: Vector dimension
+            expected_size: Number of vectors about to be added; small indexes stay flat
+            
+        Returns:
+            HNSW index for large collections, flat index otherwise
+        """
+        quantization = self._effective_quantization(expected_size)
+        metric = faiss.METRIC_INNER_PRODUCT
+        
+        if self.config.use_hnsw and expected_size >= self.config.hnsw_min_vectors:
+            M = self.config.hnsw_m
+            if quantization in SQ_TYPES:
+                index = faiss.IndexHNSWSQ(dimension, SQ_TYPES[quantization], M, metric)
+            elif quantization == "pq":
+                index = faiss.IndexHNSWPQ(dimension, self.config.pq_m, M, 8, metric)
+            else:
+                index = faiss.IndexHNSWFlat(dimension, M, metric)
+            index.hnsw.efConstruction = self.config.hnsw_ef_construction
+            return self._configure_index(index)
+        
+        if quantization in SQ_TYPES:
+            return faiss.IndexScalarQuantizer(dimension, SQ_TYPES[quantization], metric)
+        if quantization == "pq":
+            return faiss.IndexPQ(dimension, self.config.pq_m, 8, metric)
+        return faiss.IndexFlatIP(dimension)
+    
+    def _effective_quantization(self, expected_size: int) -> str:
+        """
+        Resolve the configured quantization against the data available for training
+        
+        Trained quantizers need vectors before use, so an index created without
+        vectors stays fp32 (fp16 needs no training and is kept) and PQ degrades to
+        SQ8 until there are enough vectors to fit its 256-centroid codebooks.
+        """
+        quantization = self.config.quantization
+        if quantization not in ("fp32", "fp16", "sq8", "pq"):
+            raise ValueError(f"Unknown quantization '{quantization}', expected fp32, fp16, sq8 or pq")
+        if expected_size == 0 and quantization != "fp16":
+            return "fp32"
+        if quantization == "pq" and expected_size < PQ_MIN_TRAINING_VECTORS:
+            return "sq8"
+        return quantization
+    
+    @staticmethod
+    def _index_quantization(index: faiss.Index) -> str:
+        """Quantization setting an existing index was built with (fp32, fp16, sq8 or pq)"""
+        qtype = index_qtype(index)
+        for quantization, sq_type in SQ_TYPES.items():
+            if qtype == sq_type:
+                return quantization
+        storage = faiss.downcast_index(index.storage) if hasattr(index, 'hnsw') else index
+        return "pq" if isinstance(storage, faiss.IndexPQ) else "fp32"
+    
+    def _configure_index(self, index: faiss.Index) -> faiss.Index:
+        """Apply search-time parameters to a new or loaded index"""
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = self.config.hnsw_ef_search
+        return index
+    
+    def _search_params(self, index: faiss.Index, k: int,
+                       excluded_ids: Optional[np.ndarray] = None) -> Tuple[Optional[faiss.SearchParameters], tuple]:
+        """
+        Build per-call search parameters
+        
+        HNSW indexes get efSearch = max(configured, 4k) so the graph walk explores
+        enough candidates for k results; excluded IDs are skipped inside FAISS.
+        
+        Args:
+            index: Index that will be searched
+            k: Number of results requested
+            excluded_ids: int64 IDs that must never be returned
+            
+        Returns:
+            Tuple of (params or None, keepalive); keep the second element referenced until
+            the search returns, since the selectors only hold raw pointers to each other
+        """
+        selector, keepalive = None, ()
+        if excluded_ids is not None and len(excluded_ids):
+            batch = faiss.IDSelectorBatch(excluded_ids)
+            selector = faiss.IDSelectorNot(batch)
+            keepalive = (excluded_ids, batch, selector)
+        
+        if hasattr(index, 'hnsw'):
+            ef_search = max(self.config.hnsw_ef_search, k * 4)
+            if selector is not None:
+                return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search), keepalive
+            return faiss.SearchParametersHNSW(efSearch=ef_search), keepalive
+        
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector), keepalive
+        return None, keepalive
+    
+    def _add_in_chunks(self, index: faiss.Index, vectors: np.ndarray) -> faiss.Index:
+        """Add vectors in fixed-size chunks to bound transient allocations"""
+        if not index.is_trained:
+            index.train(vectors)
+        chunk_size = self.config.index_add_chunk_size
+        for start in range(0, len(vectors), chunk_size):
+            index.add(vectors[start:start + chunk_size])
+        return index
     
     def _encode_query(self, query: str) -> np.ndarray:
-        """Encode a query string to vector"""
-        return self.embedding_model.encode([query]).astype('float32')
+        """
+        Encode a query string to an L2-normalized (1, d) float32 vector
+        
+        Whitespace runs are collapsed first (the tokenizer ignores them), so
+        trivially different spellings of a query share one entry. Results are kept
+        in an LRU keyed by a 16-byte BLAKE2b digest of the query, so long queries do
+        not pin their text in memory. The returned array is shared between callers
+        and must not be modified.
+        """
+        query = " ".join(query.split())
+        key = hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
+        vector = self._query_cache.get(key)
+        if vector is not None:
+            self._query_cache.move_to_end(key)
+            return vector
+        
+        vector = self._encode_query_uncached(query)
+        self._query_cache[key] = vector
+        while len(self._query_cache) > self.config.query_cache_size:
+            self._query_cache.popitem(last=False)
+        return vector
+    
+    def _encode_query_uncached(self, query: str) -> np.ndarray:
+        """Encode a single query without the list round-trip"""
+        with _inference_mode():
+            vector = self.query_model.encode(query, convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(vector.reshape(1, -1), dtype=np.float32)
     
     def _encode_texts(self, texts: List[str]) -> np.ndarray:
-        """Encode a list of texts to vectors"""
-        return self.embedding_model.encode(texts).astype('float32')
+        """
+        Encode a list of texts to L2-normalized vectors in large batches
+        
+        Lists longer than encode_chunk_size are encoded chunk by chunk into one
+        preallocated array, so the encoder's intermediate tensors stay bounded.
+        """
+        chunk_size = self.config.encode_chunk_size
+        if len(texts) <= chunk_size:
+            return self._encode_batch(texts)
+        
+        vectors = np.empty((len(texts), self.embedding_model.get_sentence_embedding_dimension()), dtype='float32')
+        for start in range(0, len(texts), chunk_size):
+            vectors[start:start + chunk_size] = self._encode_batch(texts[start:start + chunk_size])
+        return vectors
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts in one encoder call
+        
+        sentence-transformers sorts the texts by length before batching, so each
+        batch is padded only to its own longest text (smart batching). On CUDA the
+        model runs in fp16 (encode_fp16); output is always float32 for FAISS.
+        Encoding runs under torch.inference_mode() so no autograd state is kept.
+        """
+        with _inference_mode():
+            vectors = self.embedding_model.encode(
+                texts,
+                batch_size=self.config.encode_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    
+    def _encode_texts_iter(self, texts: List[str], chunk_size: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Encode texts chunk by chunk, yielding normalized float32 arrays"""
+        chunk_size = chunk_size or self.config.encode_chunk_size
+        return self._encode_chunks_iter(
+            texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)
+        )
+    
+    def _encode_chunks_iter(self, chunks: Iterable[List[str]]) -> Iterator[np.ndarray]:
+        """
+        Encode an iterable of text chunks, one chunk ahead of the consumer
+        
+        Chunk N+1 is encoded on a worker thread while the caller processes chunk N
+        (e.g. adds it to FAISS), so only two chunks of vectors are alive at a time.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for chunk in chunks:
+                future = executor.submit(self._encode_texts, chunk)
+                if pending is not None:
+                    yield pending.result()
+                pending = future
+            if pending is not None:
+                yield pending.result()
+    
+    def _training_target(self, expected_size: int) -> int:
+        """Vectors to buffer before training a quantizer for an index of expected_size"""
+        if self._effective_quantization(expected_size) == "pq":
+            return min(PQ_MIN_TRAINING_VECTORS, expected_size)
+        # SQ ranges are learned per dimension; a handful of vectors would clip later ones
+        return min(self.config.encode_chunk_size, expected_size)
+    
+    def _stream_into_index(self, index: faiss.Index, vector_chunks: Iterable[np.ndarray],
+                           expected_size: int) -> Tuple[int, int]:
+        """
+        Add streamed vector chunks to an index, training it first if required
+        
+        Args:
+            index: Index created by _create_empty_index
+            vector_chunks: Iterable of (n, d) float32 arrays
+            expected_size: Total number of vectors expected (sizes the training set)
+            
+        Returns:
+            (number of vectors added, number of vectors the index was trained on)
+        """
+        min_training = self._training_target(expected_size)
+        untrained = []
+        added = 0
+        trained_on = 0
+        
+        for vectors in vector_chunks:
+            if index.is_trained:
+                index.add(vectors)
+                added += len(vectors)
+                continue
+            
+            # Buffer chunks until there is enough data to train the quantizer
+            untrained.append(vectors)
+            if sum(len(v) for v in untrained) >= min_training:
+                training = np.vstack(untrained)
+                index.train(training)
+                index.add(training)
+                added += len(training)
+                trained_on = len(training)
+                untrained = []
+        
+        if untrained:
+            training = np.vstack(untrained)
+            index.train(training)
+            index.add(training)
+            added += len(training)
+            trained_on = len(training)
+        
+        return added, trained_on
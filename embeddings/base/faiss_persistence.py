@@ -1,12 +1,186 @@
-import faiss
+from __future__ import annotations
+
 import json
+import mmap
 import hashlib
 import os
+import re
+import struct
+import time
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, Set, Tuple, Optional, Any
+import numpy as np
 from logger import logger
 from utils.database import db_manager
+if TYPE_CHECKING:
+    import faiss
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Change-detection hash for tool data; stored in metadata so indexes saved with a
+# different algorithm are rebuilt once instead of failing validation forever
+CHECKSUM_ALGORITHM = "blake3-v2" if BLAKE3_AVAILABLE else "blake2b-v2"
+
+
+@lru_cache(maxsize=None)
+def _ensure_tools_update_index() -> None:
+    """Create the index that turns MAX(updated_at) on active tools into one probe (once per process)"""
+    try:
+        db_manager.execute_command(
+            "CREATE INDEX IF NOT EXISTS idx_tools_active_updated ON tools (active, updated_at DESC)"
+        )
+    except Exception as e:
+        logger.log_error("tools_update_index_failed", str(e), "Failed to ensure idx_tools_active_updated")
+
+
+def _query_examples_text(tool: Dict) -> str:
+    """Stable string form of a tool's query_examples for hashing"""
+    query_examples = tool['query_examples']
+    if not isinstance(query_examples, str):
+        query_examples = json.dumps(query_examples, sort_keys=True, default=str)
+    return query_examples
+
+
+def tool_content_hash(name: str, tool: Dict) -> str:
+    """
+    Hash one tool's searchable content, stored per entry in the tool mapping
+    
+    Args:
+        name: Tool name
+        tool: Tool data from database
+        
+    Returns:
+        Hex digest that changes whenever the tool's indexed content changes
+    """
+    hasher = _new_checksum_hasher()
+    hasher.update(f"{tool['id']}|{name}|{tool['description']}|".encode('utf-8'))
+    hasher.update(_query_examples_text(tool).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _stat_or_none(path: Path) -> Optional[os.stat_result]:
+    """Stat a file in one syscall, returning None if it does not exist"""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _new_checksum_hasher():
+    """Create the hasher for CHECKSUM_ALGORITHM (BLAKE3 if installed, else stdlib BLAKE2b)"""
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3()
+    return hashlib.blake2b(digest_size=32)
+
+
+# On-disk layout of the tool mapping: dense JSON record list + int64 ids in .npy
+MAPPING_LAYOUT_VERSION = "1.2"
+
+# Self-validating footer appended to .faiss files: magic, payload length and a
+# BLAKE2b digest of the first TRAILER_HASH_BYTES of the payload
+TRAILER_MAGIC = b"PHIFTRL1"
+TRAILER_FORMAT = "<8sQ32s"
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+TRAILER_HASH_BYTES = 1 << 20
+
+def _payload_digest(f, payload_size: int) -> bytes:
+    """Hash the leading region of an index payload (header and start of the vectors)"""
+    f.seek(0)
+    return hashlib.blake2b(f.read(min(payload_size, TRAILER_HASH_BYTES)), digest_size=32).digest()
+
+
+def _append_trailer(path: Path) -> None:
+    """Append the length/digest footer to a freshly written index file"""
+    with open(path, 'r+b') as f:
+        payload_size = f.seek(0, os.SEEK_END)
+        digest = _payload_digest(f, payload_size)
+        f.seek(0, os.SEEK_END)
+        f.write(struct.pack(TRAILER_FORMAT, TRAILER_MAGIC, payload_size, digest))
+
+
+def _verify_trailer(path: Path) -> Optional[str]:
+    """
+    Check an index file against its footer
+    
+    Returns:
+        Description of the problem, or None if the file is intact
+    """
+    with open(path, 'rb') as f:
+        file_size = f.seek(0, os.SEEK_END)
+        if file_size < TRAILER_SIZE:
+            return "Index file too small for trailer"
+        f.seek(file_size - TRAILER_SIZE)
+        magic, payload_size, digest = struct.unpack(TRAILER_FORMAT, f.read(TRAILER_SIZE))
+        if magic != TRAILER_MAGIC:
+            return "Index file has no trailer"
+        if payload_size != file_size - TRAILER_SIZE:
+            return "Index file length mismatch - possible corruption"
+        if _payload_digest(f, payload_size) != digest:
+            return "Index file digest mismatch - possible corruption"
+    return None
+
+
+def _hash_file(path: Path) -> str:
+    """
+    Full-file BLAKE2b digest used by the deep integrity check
+    
+    Never materializes the file as bytes: hashlib.file_digest (3.11+) hashes with a
+    reusable C buffer, otherwise the file is mapped and hashed from the page cache.
+    """
+    new_hasher = lambda: hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, new_hasher).hexdigest()
+        hasher = new_hasher()
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(memoryview(mm))
+        return hasher.hexdigest()
+
+
+def _faiss():
+    """
+    Import faiss on first use
+    
+    Checksum, stats and cleanup calls never touch the native extension, so
+    short-lived tools that only use those skip loading it entirely.
+    """
+    import faiss
+    return faiss
+
+
+def index_metric(index) -> str:
+    """Name of an index's distance metric as stored in metadata"""
+    return "inner_product" if index.metric_type == _faiss().METRIC_INNER_PRODUCT else "l2"
+
+
+def index_qtype(index) -> Optional[int]:
+    """Scalar quantizer type of a flat or HNSW index, or None for unquantized storage"""
+    storage = _faiss().downcast_index(index.storage) if hasattr(index, 'hnsw') else index
+    return storage.sq.qtype if hasattr(storage, 'sq') else None
+
+
+def _mmap_read_flags() -> int:
+    """Memory-map flat index codes where supported (IO_FLAG_MMAP alone only covers IVF lists)"""
+    faiss = _faiss()
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# Index types whose storage can be mapped (IndexFlatCodes family and IVF lists);
+# graph indexes such as HNSW are always read into memory
+MMAP_COMPATIBLE_PREFIXES = ("IndexFlat", "IndexScalarQuantizer", "IndexPQ", "IndexIVF")
 
 
 class FaissPersistenceManager:
@@ -14,34 +188,171 @@ class FaissPersistenceManager:
     Handles FAISS index persistence, validation, and synchronization with database
     """
     
-    def __init__(self, index_dir: str = "./embeddings/indexes/tools"):
+    def __init__(self, index_dir: str = "./embeddings/indexes/tools", mmap: bool = True,
+                 validation_ttl_seconds: float = 60):
         self.index_dir = Path(index_dir)
+        self.mmap = mmap  # Map compatible indexes read-only on load: O(1) load, slightly slower first searches
+        
+        # Freshness window: a validated (index, mapping) pair is reused without
+        # touching disk or the database until the TTL expires
+        self.validation_ttl_seconds = validation_ttl_seconds
+        self._validated: Optional[Tuple[faiss.Index, Dict]] = None
+        self._last_validated_at = 0.0
         self.index_dir.mkdir(parents=True, exist_ok=True)
         
         self.index_file = self.index_dir / "tools.faiss"
         self.metadata_file = self.index_dir / "tools_metadata.json"
         self.mapping_file = self.index_dir / "tools_mapping.json"
+        self.mapping_ids_file = self.index_dir / "tools_mapping_ids.npy"
+        self._backup_re = re.compile(r'^tools_backup_.+\.faiss$')
+        self._stats_cache: Optional[Tuple[Optional[int], Dict[str, Any]]] = None  # (metadata mtime_ns, stats)
+        
+        # Last checksum computed: (tools_data dict, tool count, digest). Holding the dict
+        # keeps its id() from being reused while the entry is alive.
+        self._checksum_cache: Optional[Tuple[Dict, int, str]] = None
+    
+    def will_mmap(self, index_type: Optional[str], mmap: Optional[bool] = None) -> bool:
+        """
+        Check whether an index of the given type would be memory-mapped on load
+        
+        Args:
+            index_type: FAISS class name from metadata (None if unknown)
+            mmap: Override for the manager's mmap setting
+            
+        Returns:
+            True if the index will be mapped read-only
+        """
+        if not (self.mmap if mmap is None else mmap):
+            return False
+        return index_type is None or index_type.startswith(MMAP_COMPATIBLE_PREFIXES)
+    
+    def read_index(self, mmap: Optional[bool] = None, index_type: Optional[str] = None) -> faiss.Index:
+        """
+        Read the persisted FAISS index
+        
+        Args:
+            mmap: Map the file read-only so pages load on demand (the index cannot be added to);
+                None uses the manager's setting
+            index_type: FAISS class name from metadata; incompatible types are read normally
+            
+        Returns:
+            Loaded FAISS index
+            
+        Raises:
+            ValueError: If the file fails its trailer check
+        """
+        trailer_issue = _verify_trailer(self.index_file)
+        if trailer_issue:
+            raise ValueError(trailer_issue)
+        
+        faiss = _faiss()
+        if self.will_mmap(index_type, mmap):
+            return faiss.read_index(str(self.index_file), _mmap_read_flags())
+        return faiss.read_index(str(self.index_file))
+    
+    def write_index(self, index: faiss.Index) -> None:
+        """
+        Write a FAISS index via a temporary file and atomic rename
+        
+        Readers (including ones that have the old file mapped) always see a complete snapshot.
+        A trailer with the payload length and digest makes the file self-validating.
+        """
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        _faiss().write_index(index, str(tmp_file))
+        _append_trailer(tmp_file)
+        fd = os.open(tmp_file, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, self.index_file)
+    
+    @staticmethod
+    def _write_atomic(path: Path, write: Callable) -> None:
+        """Call write(f) on a temporary binary file, fsync it and rename it over path"""
+        tmp_file = path.with_name(path.name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    
+    @classmethod
+    def write_json_atomic(cls, path: Path, data: Any, default=None) -> None:
+        """
+        Write compact JSON via a temporary file, fsync and atomic rename
+        
+        A crash mid-write leaves the previous file intact instead of a truncated one.
+        Uses orjson when installed; these files are machine-read, so no indentation.
+        
+        Args:
+            path: Destination file
+            data: JSON-serializable object (non-string dict keys are stringified)
+            default: Fallback serializer for unsupported types
+        """
+        if ORJSON_AVAILABLE:
+            payload = orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(data, default=default, separators=(',', ':')).encode('utf-8')
+        cls._write_atomic(path, lambda f: f.write(payload))
+    
+    def _write_tool_mapping(self, tool_mapping: Dict) -> None:
+        """
+        Write the tool mapping as int64 ids (.npy) plus a dense JSON list of the other fields
+        
+        Positions are implicit in list order, so no per-entry keys are stored.
+        """
+        entries = [entry for _, entry in sorted(tool_mapping.items(), key=lambda item: int(item[0]))]
+        ids = np.fromiter((entry['id'] for entry in entries), dtype=np.int64, count=len(entries))
+        records = [{k: v for k, v in entry.items() if k != 'id'} for entry in entries]
+        
+        self._write_atomic(self.mapping_ids_file, lambda f: np.save(f, ids))
+        self.write_json_atomic(self.mapping_file, records)
+    
+    def _read_tool_mapping(self) -> Dict[int, Dict]:
+        """Read the tool mapping written by _write_tool_mapping"""
+        ids = np.load(self.mapping_ids_file, mmap_mode='r')
+        with open(self.mapping_file, 'r') as f:
+            records = json.load(f)
+        if len(records) != len(ids):
+            raise ValueError(f"Mapping length mismatch: {len(records)} records, {len(ids)} ids")
+        return {i: {**record, 'id': int(tool_id)} for i, (record, tool_id) in enumerate(zip(records, ids))}
         
     def calculate_tools_checksum(self, tools_data: Dict) -> str:
         """
-        Calculate SHA256 checksum of tools data for change detection
+        Calculate checksum of tools data for change detection
+        
+        This is an internal integrity tag, not a security boundary, so a fast
+        non-cryptographic-strength hash (see CHECKSUM_ALGORITHM) is sufficient.
         
         Args:
             tools_data: Dictionary of tool data from database
             
         Returns:
-            SHA256 hex digest of tools data
+            Hex digest of tools data
         """
-        # Create deterministic representation of tools data
-        tools_list = []
-        for name in sorted(tools_data.keys()):
-            tool = tools_data[name]
+        # The same dict is typically validated and then saved; hash it only once
+        cached = self._checksum_cache
+        if cached is not None and cached[0] is tools_data and cached[1] == len(tools_data):
+            return cached[2]
+        
+        # Stream each field into the hasher so no copy of the whole corpus is built
+        hasher = _new_checksum_hasher()
+        for name, tool in sorted(tools_data.items(), key=itemgetter(0)):
             # Include fields that affect embeddings/search
-            tool_repr = f"{tool['id']}|{name}|{tool['description']}|{tool['query_examples']}"
-            tools_list.append(tool_repr)
+            query_examples = _query_examples_text(tool)
+            hasher.update(str(tool['id']).encode('utf-8'))
+            hasher.update(b'|')
+            hasher.update(name.encode('utf-8'))
+            hasher.update(b'|')
+            hasher.update(str(tool['description']).encode('utf-8'))
+            hasher.update(b'|')
+            hasher.update(query_examples.encode('utf-8'))
+            hasher.update(b'\x1e')  # Record separator between tools
         
-        combined_data = "|".join(tools_list)
-        return hashlib.sha256(combined_data.encode('utf-8')).hexdigest()
+        digest = hasher.hexdigest()
+        self._checksum_cache = (tools_data, len(tools_data), digest)
+        return digest
     
     def get_database_last_update(self) -> Optional[str]:
         """
@@ -51,6 +362,7 @@ class FaissPersistenceManager:
             ISO format timestamp string or None if no tools found
         """
         try:
+            _ensure_tools_update_index()
             query = """
             SELECT MAX(updated_at) FROM tools WHERE active = TRUE
             """
@@ -65,6 +377,117 @@ class FaissPersistenceManager:
             logger.log_error("db_timestamp_query_failed", str(e), "Failed to query database timestamps")
             return None
     
+    def _read_metadata_if_current(self, index: faiss.Index, tools_checksum: str, embedding_model: str) -> Optional[Dict]:
+        """
+        Return the on-disk metadata if it already describes this index, else None
+        
+        Args:
+            index: Index about to be saved
+            tools_checksum: Checksum of the tools the index was built from
+            embedding_model: Name of embedding model used
+        """
+        file_stats = {f: _stat_or_none(f) for f in (self.index_file, self.mapping_file, self.mapping_ids_file)}
+        if any(st is None for st in file_stats.values()) or not self.metadata_file.exists():
+            return None
+        
+        try:
+            with open(self.metadata_file, 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        unchanged = (
+            metadata.get("index_version") == MAPPING_LAYOUT_VERSION
+            and metadata.get("checksum_algorithm") == CHECKSUM_ALGORITHM
+            and metadata.get("tools_checksum") == tools_checksum
+            and metadata.get("embedding_model") == embedding_model
+            and metadata.get("index_type") == type(index).__name__
+            and metadata.get("vector_dimension") == index.d
+            and metadata.get("metric") == index_metric(index)
+            and metadata.get("qtype") == index_qtype(index)
+            and metadata.get("index_file_size") == file_stats[self.index_file].st_size
+            and metadata.get("mapping_file_size") == file_stats[self.mapping_file].st_size
+            and metadata.get("mapping_ids_file_size") == file_stats[self.mapping_ids_file].st_size
+        )
+        return metadata if unchanged else None
+    
+    def load_unvalidated(self, embedding_model: str) -> Tuple[Optional[faiss.Index], Optional[Dict]]:
+        """
+        Load the persisted index and mapping without checking them against the database
+        
+        Used to patch a stale index in place of a full rebuild. Only the layout,
+        embedding model and file trailer are checked.
+        
+        Args:
+            embedding_model: Expected embedding model name
+            
+        Returns:
+            Tuple of (index, tool_mapping), or (None, None) if unusable
+        """
+        try:
+            if not all(f.exists() for f in (self.index_file, self.metadata_file, self.mapping_file, self.mapping_ids_file)):
+                return None, None
+            
+            with open(self.metadata_file, 'r') as f:
+                metadata = json.load(f)
+            
+            if (metadata.get("index_version") != MAPPING_LAYOUT_VERSION
+                    or metadata.get("embedding_model") != embedding_model):
+                return None, None
+            
+            return self.read_index(index_type=metadata.get("index_type")), self._read_tool_mapping()
+            
+        except Exception as e:
+            logger.log_error("faiss_index_unvalidated_load_failed", str(e), "Failed to load persisted index for patching")
+            return None, None
+    
+    def diff_tools(self, tools_data: Dict, tool_mapping: Optional[Dict] = None) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        Compare current tools with the per-tool hashes stored in a mapping
+        
+        Args:
+            tools_data: Current tools data from database
+            tool_mapping: Persisted mapping to compare with (read from disk if None)
+            
+        Returns:
+            Tuple of (added, removed, modified) tool names
+        """
+        if tool_mapping is None:
+            tool_mapping = self._read_tool_mapping()
+        
+        old_hashes = {entry['name']: entry.get('content_hash') for entry in tool_mapping.values()}
+        new_hashes = {name: tool_content_hash(name, tool) for name, tool in tools_data.items()}
+        
+        added = new_hashes.keys() - old_hashes.keys()
+        removed = old_hashes.keys() - new_hashes.keys()
+        modified = {name for name in new_hashes.keys() & old_hashes.keys() if new_hashes[name] != old_hashes[name]}
+        return added, removed, modified
+    
+    def tools_changed_since(self, base_db_update: Optional[str]) -> bool:
+        """
+        Check whether any tool row was modified after the given base version
+        
+        Args:
+            base_db_update: ISO timestamp stored in metadata when the index was saved
+            
+        Returns:
+            True if tools changed (or the answer is unknown), False if nothing changed
+        """
+        if not base_db_update:
+            return True
+        
+        try:
+            _ensure_tools_update_index()
+            result = db_manager.execute_query(
+                "SELECT 1 FROM tools WHERE updated_at > %s LIMIT 1",
+                (base_db_update,)
+            )
+            return bool(result)
+            
+        except Exception as e:
+            logger.log_error("db_changes_query_failed", str(e), "Failed to query tool changes since index creation")
+            return True
+    
     def save_index_with_metadata(self, 
                                 index: faiss.Index, 
                                 tool_mapping: Dict, 
@@ -83,29 +506,51 @@ class FaissPersistenceManager:
             True if save successful, False otherwise
         """
         try:
+            tools_checksum = self.calculate_tools_checksum(tools_data)
+            
+            # Same tools and model as what is already on disk: skip rewriting the
+            # index and mapping, only refresh the base version in metadata
+            existing = self._read_metadata_if_current(index, tools_checksum, embedding_model)
+            if existing is not None:
+                existing["last_db_update"] = self.get_database_last_update()
+                existing["last_saved_at"] = datetime.now().isoformat()
+                self.write_json_atomic(self.metadata_file, existing)
+                self._mark_validated(index, tool_mapping)
+                logger.log_system_event(
+                    "faiss_index_save_skipped", 
+                    f"Index for {len(tools_data)} tools unchanged; refreshed metadata only"
+                )
+                return True
+            
             # Save FAISS index
-            faiss.write_index(index, str(self.index_file))
+            self.write_index(index)
             
             # Save tool mapping
-            with open(self.mapping_file, 'w') as f:
-                json.dump(tool_mapping, f, indent=2)
+            self._write_tool_mapping(tool_mapping)
             
             # Create and save metadata
             metadata = {
-                "index_version": "1.0",
+                "index_version": MAPPING_LAYOUT_VERSION,
                 "created_at": datetime.now().isoformat(),
                 "tools_count": len(tools_data),
-                "tools_checksum": self.calculate_tools_checksum(tools_data),
+                "tools_checksum": tools_checksum,
+                "checksum_algorithm": CHECKSUM_ALGORITHM,
                 "embedding_model": embedding_model,
                 "index_type": type(index).__name__,
+                "metric": index_metric(index),
+                "qtype": index_qtype(index),
                 "vector_dimension": index.d,
                 "last_db_update": self.get_database_last_update(),
-                "index_file_size": os.path.getsize(self.index_file),
-                "mapping_file_size": os.path.getsize(self.mapping_file)
+                "index_file_size": os.stat(self.index_file).st_size,
+                "mapping_file_size": os.stat(self.mapping_file).st_size,
+                "mapping_ids_file_size": os.stat(self.mapping_ids_file).st_size,
+                "file_digests": self._hash_artifacts()
             }
             
-            with open(self.metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            # Sizes above are read after the renames, so they match the final files
+            self.write_json_atomic(self.metadata_file, metadata)
+            
+            self._mark_validated(index, tool_mapping)
             
             logger.log_system_event(
                 "faiss_index_saved", 
@@ -118,13 +563,28 @@ class FaissPersistenceManager:
             logger.log_error("faiss_index_save_failed", str(e), "Failed to save FAISS index")
             return False
     
-    def load_index_with_validation(self, tools_data: Dict, embedding_model: str = "all-MiniLM-L6-v2") -> Tuple[Optional[faiss.Index], Optional[Dict], bool]:
+    def _mark_validated(self, index: faiss.Index, tool_mapping: Dict) -> None:
+        """Remember a known-current index and mapping for the freshness window"""
+        self._validated = (index, tool_mapping)
+        self._last_validated_at = time.monotonic()
+    
+    def invalidate(self) -> None:
+        """Drop the freshness shortcut so the next load fully revalidates"""
+        self._validated = None
+        self._last_validated_at = 0.0
+    
+    def load_index_with_validation(self, tools_data: Dict, embedding_model: str = "all-MiniLM-L6-v2",
+                                   force: bool = False) -> Tuple[Optional[faiss.Index], Optional[Dict], bool]:
         """
         Load FAISS index from disk with comprehensive validation
         
+        Within validation_ttl_seconds of the last successful validation or save, the
+        same index and mapping are returned without any I/O.
+        
         Args:
             tools_data: Current tools data from database for validation
             embedding_model: Expected embedding model name
+            force: Ignore the freshness window and revalidate now
             
         Returns:
             Tuple of (index, tool_mapping, is_valid)
@@ -132,9 +592,19 @@ class FaissPersistenceManager:
             - tool_mapping: Tool mapping dict or None if invalid  
             - is_valid: True if index is current and valid
         """
+        if (not force and self._validated is not None
+                and time.monotonic() - self._last_validated_at < self.validation_ttl_seconds):
+            index, tool_mapping = self._validated
+            return index, tool_mapping, True
+        
         try:
             # Check if all required files exist
-            if not all(f.exists() for f in [self.index_file, self.metadata_file, self.mapping_file]):
+            # One stat per file serves both the existence and the size checks
+            file_stats = {
+                f: _stat_or_none(f)
+                for f in (self.index_file, self.metadata_file, self.mapping_file, self.mapping_ids_file)
+            }
+            if any(st is None for st in file_stats.values()):
                 logger.log_system_event("faiss_index_missing", "Index files not found, will rebuild")
                 return None, None, False
             
@@ -142,55 +612,31 @@ class FaissPersistenceManager:
             with open(self.metadata_file, 'r') as f:
                 metadata = json.load(f)
             
-            # Validate metadata integrity
-            validation_issues = []
-            
-            # Check embedding model consistency
-            if metadata.get("embedding_model") != embedding_model:
-                validation_issues.append(f"Embedding model mismatch: expected {embedding_model}, got {metadata.get('embedding_model')}")
-            
-            # Check tools count
-            if metadata.get("tools_count") != len(tools_data):
-                validation_issues.append(f"Tools count mismatch: expected {len(tools_data)}, got {metadata.get('tools_count')}")
-            
-            # Check tools data checksum
-            current_checksum = self.calculate_tools_checksum(tools_data)
-            if metadata.get("tools_checksum") != current_checksum:
-                validation_issues.append(f"Tools data changed: checksum mismatch")
-            
-            # Check file sizes for corruption detection
-            if os.path.getsize(self.index_file) != metadata.get("index_file_size", 0):
-                validation_issues.append("Index file size mismatch - possible corruption")
-            
-            if os.path.getsize(self.mapping_file) != metadata.get("mapping_file_size", 0):
-                validation_issues.append("Mapping file size mismatch - possible corruption")
-            
-            # Check database update timestamp
-            current_db_update = self.get_database_last_update()
-            if current_db_update and metadata.get("last_db_update") != current_db_update:
-                validation_issues.append(f"Database updated since index creation")
-            
-            # If validation issues found, return invalid
-            if validation_issues:
+            # Validate cheapest checks first and stop at the first failure
+            validation_issue = self._first_validation_issue(metadata, tools_data, embedding_model, file_stats)
+            if validation_issue:
                 logger.log_system_event(
                     "faiss_index_invalid", 
-                    f"Index validation failed: {'; '.join(validation_issues)}"
+                    f"Index validation failed: {validation_issue}"
                 )
                 return None, None, False
             
             # Load index and mapping
-            index = faiss.read_index(str(self.index_file))
+            index = self.read_index(index_type=metadata.get("index_type"))
             
-            with open(self.mapping_file, 'r') as f:
-                tool_mapping = json.load(f)
+            tool_mapping = self._read_tool_mapping()
             
             # Final validation: check index dimensions
             expected_dimension = metadata.get("vector_dimension", 384)
             if index.d != expected_dimension:
-                validation_issues.append(f"Index dimension mismatch: expected {expected_dimension}, got {index.d}")
+                logger.log_system_event(
+                    "faiss_index_invalid", 
+                    f"Index dimension mismatch: expected {expected_dimension}, got {index.d}"
+                )
                 return None, None, False
             
             # Success - index is valid and current
+            self._mark_validated(index, tool_mapping)
             logger.log_system_event(
                 "faiss_index_loaded", 
                 f"Successfully loaded valid index with {len(tool_mapping)} tools"
@@ -202,6 +648,55 @@ class FaissPersistenceManager:
             logger.log_error("faiss_index_load_failed", str(e), "Failed to load FAISS index")
             return None, None, False
     
+    def _first_validation_issue(self, metadata: Dict, tools_data: Dict, embedding_model: str,
+                                file_stats: Dict[Path, os.stat_result]) -> Optional[str]:
+        """
+        Check persisted metadata against current state, cheapest checks first
+        
+        Args:
+            metadata: Loaded index metadata
+            tools_data: Current tools data from database
+            embedding_model: Expected embedding model name
+            file_stats: stat results for the index, metadata and mapping files
+            
+        Returns:
+            Description of the first issue found, or None if the index is current
+        """
+        # Indexes written with an older mapping layout are rebuilt once
+        if metadata.get("index_version") != MAPPING_LAYOUT_VERSION:
+            return f"Index layout changed: expected {MAPPING_LAYOUT_VERSION}, got {metadata.get('index_version')}"
+        
+        # Check tools count
+        if metadata.get("tools_count") != len(tools_data):
+            return f"Tools count mismatch: expected {len(tools_data)}, got {metadata.get('tools_count')}"
+        
+        # Check file sizes for corruption detection (the index file checks itself
+        # against its trailer when read)
+        if file_stats[self.mapping_file].st_size != metadata.get("mapping_file_size", 0):
+            return "Mapping file size mismatch - possible corruption"
+        
+        if file_stats[self.mapping_ids_file].st_size != metadata.get("mapping_ids_file_size", 0):
+            return "Mapping ids file size mismatch - possible corruption"
+        
+        # Check embedding model consistency
+        if metadata.get("embedding_model") != embedding_model:
+            return f"Embedding model mismatch: expected {embedding_model}, got {metadata.get('embedding_model')}"
+        
+        # Indexes saved with another checksum algorithm are rebuilt
+        if metadata.get("checksum_algorithm") != CHECKSUM_ALGORITHM:
+            return f"Checksum algorithm changed: expected {CHECKSUM_ALGORITHM}, got {metadata.get('checksum_algorithm', 'sha256')}"
+        
+        # Base-version fast path: nothing modified since the index was saved means
+        # the tool contents cannot differ, so the checksum can be skipped
+        if not self.tools_changed_since(metadata.get("last_db_update")):
+            return None
+        
+        # Something changed (or the base version is unknown): hash the full tools corpus
+        if metadata.get("tools_checksum") != self.calculate_tools_checksum(tools_data):
+            return "Tools data changed: checksum mismatch"
+        
+        return None
+    
     def cleanup_old_indexes(self, keep_backups: int = 2) -> None:
         """
         Clean up old index files, keeping only recent backups
@@ -210,30 +705,86 @@ class FaissPersistenceManager:
             keep_backups: Number of backup versions to keep
         """
         try:
-            # Look for backup files (if implemented)
-            backup_pattern = "tools_backup_*.faiss"
-            backup_files = list(self.index_dir.glob(backup_pattern))
+            # Look for backup files (if implemented); DirEntry.stat() reuses the directory read
+            with os.scandir(self.index_dir) as entries:
+                backup_files = [
+                    (entry.stat().st_mtime, entry.path, entry.name)
+                    for entry in entries
+                    if self._backup_re.match(entry.name) and entry.is_file()
+                ]
             
             if len(backup_files) > keep_backups:
                 # Sort by modification time and remove oldest
-                backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-                for old_backup in backup_files[keep_backups:]:
-                    old_backup.unlink()
-                    logger.log_system_event("faiss_backup_cleaned", f"Removed old backup: {old_backup.name}")
+                backup_files.sort(reverse=True)
+                for _, path, name in backup_files[keep_backups:]:
+                    os.unlink(path)
+                    logger.log_system_event("faiss_backup_cleaned", f"Removed old backup: {name}")
                     
         except Exception as e:
             logger.log_error("faiss_cleanup_failed", str(e), "Failed to cleanup old index files")
     
+    def _hash_artifacts(self) -> Dict[str, str]:
+        """Hash the index and mapping files concurrently, overlapping reads with hashing"""
+        files = (self.index_file, self.mapping_file, self.mapping_ids_file)
+        with ThreadPoolExecutor(max_workers=len(files)) as executor:
+            digests = executor.map(_hash_file, files)
+            return {f.name: digest for f, digest in zip(files, digests)}
+    
+    def integrity_check(self, deep: bool = True) -> Dict[str, Any]:
+        """
+        Verify the persisted index files without loading them
+        
+        Args:
+            deep: Also hash every file in full and compare with the digests recorded at save
+            
+        Returns:
+            Dictionary with 'ok' flag and list of 'issues'
+        """
+        issues = []
+        try:
+            missing = [f.name for f in (self.index_file, self.metadata_file, self.mapping_file, self.mapping_ids_file)
+                       if not f.exists()]
+            if missing:
+                return {"ok": False, "issues": [f"Missing files: {', '.join(missing)}"]}
+            
+            trailer_issue = _verify_trailer(self.index_file)
+            if trailer_issue:
+                issues.append(trailer_issue)
+            
+            if deep:
+                with open(self.metadata_file, 'r') as f:
+                    expected = json.load(f).get("file_digests")
+                if not expected:
+                    issues.append("No file digests recorded in metadata")
+                else:
+                    for name, digest in self._hash_artifacts().items():
+                        if expected.get(name) != digest:
+                            issues.append(f"Digest mismatch for {name}")
+                            
+        except Exception as e:
+            logger.log_error("faiss_integrity_check_failed", str(e), "Failed to check index integrity")
+            issues.append(f"Integrity check error: {e}")
+        
+        return {"ok": not issues, "issues": issues}
+    
     def get_index_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the persisted index
         
+        Results are cached until the metadata file's mtime changes (every save
+        rewrites it last), so repeated polling costs a single stat.
+        
         Returns:
             Dictionary with index statistics
         """
+        metadata_stat = _stat_or_none(self.metadata_file)
+        mtime_ns = metadata_stat.st_mtime_ns if metadata_stat else None
+        if self._stats_cache is not None and self._stats_cache[0] == mtime_ns:
+            return dict(self._stats_cache[1])
+        
         stats = {
             "index_exists": self.index_file.exists(),
-            "metadata_exists": self.metadata_file.exists(), 
+            "metadata_exists": metadata_stat is not None, 
             "mapping_exists": self.mapping_file.exists()
         }
         
@@ -251,4 +802,5 @@ class FaissPersistenceManager:
             except Exception:
                 stats["metadata_corrupt"] = True
         
-        return stats
\ No newline at end of file
+        self._stats_cache = (mtime_ns, stats)
+        return dict(stats)
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Column-oriented storage for indexed message metadata
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from embeddings.base.rerank import ROLE_CODES, UNKNOWN_ROLE_CODE
+
+
+# Role code -> role name, the inverse of ROLE_CODES
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+ROLE_NAMES[UNKNOWN_ROLE_CODE] = 'unknown'
+
+# Column names as persisted; numeric columns go to .npz, text columns to JSON
+NUMERIC_COLUMNS = ('ids', 'conv_ids', 'created_ts', 'roles', 'sequence_numbers')
+TEXT_COLUMNS = ('contents', 'original_contents', 'conversation_titles', 'tool_names', 'tool_ids')
+
+
+def _to_unix_seconds(message: Dict) -> int:
+    """Get a message's creation time as int64 unix seconds (0 when missing)"""
+    if 'created_ts' in message:
+        return message['created_ts']
+    created_at = message.get('created_at')
+    return int(datetime.fromisoformat(created_at).timestamp()) if created_at else 0
+
+
+class MessageStore:
+    """
+    Struct-of-arrays store for message metadata, one row per FAISS position.
+
+    Numeric fields live in NumPy arrays so filters and re-ranking can run as
+    vectorized masks; text fields are kept in plain lists. Rows are only
+    materialized as dictionaries for the handful of results returned to callers.
+    """
+
+    def __init__(self):
+        """Initialize an empty store"""
+        self.ids = np.empty(0, dtype=np.int64)
+        self.conv_ids = np.empty(0, dtype=np.int64)
+        self.created_ts = np.empty(0, dtype=np.int64)  # Unix seconds, 0 = unknown
+        self.roles = np.empty(0, dtype=np.uint8)  # Codes from ROLE_CODES
+        self.sequence_numbers = np.empty(0, dtype=np.int64)
+        self.contents: List[str] = []
+        self.original_contents: List[str] = []
+        self.conversation_titles: List[str] = []
+        self.tool_names: List[Optional[str]] = []
+        self.tool_ids: List[Optional[int]] = []
+
+    @classmethod
+    def from_records(cls, messages: Iterable[Dict]) -> "MessageStore":
+        """
+        Build a store from message dictionaries
+
+        Args:
+            messages: Message dictionaries in FAISS position order
+
+        Returns:
+            New MessageStore
+        """
+        store = cls()
+        store.append(list(messages))
+        return store
+
+    @classmethod
+    def from_columns(cls, arrays: Dict[str, np.ndarray], text: Dict[str, List]) -> "MessageStore":
+        """
+        Build a store from persisted columns (see columns())
+
+        Args:
+            arrays: Numeric columns keyed by NUMERIC_COLUMNS names
+            text: Text columns keyed by TEXT_COLUMNS names
+
+        Returns:
+            New MessageStore
+
+        Raises:
+            ValueError: If the columns have different lengths
+        """
+        store = cls()
+        for name in NUMERIC_COLUMNS:
+            setattr(store, name, np.asarray(arrays[name], dtype=getattr(store, name).dtype))
+        for name in TEXT_COLUMNS:
+            setattr(store, name, list(text[name]))
+
+        lengths = {len(getattr(store, name)) for name in NUMERIC_COLUMNS + TEXT_COLUMNS}
+        if len(lengths) > 1:
+            raise ValueError(f"Message store column length mismatch: {sorted(lengths)}")
+        return store
+
+    def columns(self) -> Tuple[Dict[str, np.ndarray], Dict[str, List]]:
+        """
+        Get the store's columns for persistence
+
+        Returns:
+            (numeric columns, text columns)
+        """
+        arrays = {name: getattr(self, name) for name in NUMERIC_COLUMNS}
+        text = {name: getattr(self, name) for name in TEXT_COLUMNS}
+        return arrays, text
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, messages: List[Dict]):
+        """
+        Append message dictionaries as new rows
+
+        Args:
+            messages: Message dictionaries as returned by the message fetch query
+        """
+        if not messages:
+            return
+
+        n = len(messages)
+        self.ids = np.concatenate([self.ids, np.fromiter((m['id'] for m in messages), np.int64, n)])
+        self.conv_ids = np.concatenate([
+            self.conv_ids, np.fromiter((m['conversation_id'] for m in messages), np.int64, n)
+        ])
+        self.created_ts = np.concatenate([
+            self.created_ts, np.fromiter((_to_unix_seconds(m) for m in messages), np.int64, n)
+        ])
+        self.roles = np.concatenate([
+            self.roles, np.fromiter((ROLE_CODES.get(m['role'], UNKNOWN_ROLE_CODE) for m in messages), np.uint8, n)
+        ])
+        self.sequence_numbers = np.concatenate([
+            self.sequence_numbers, np.fromiter((m.get('sequence_number') or 0 for m in messages), np.int64, n)
+        ])
+        self.contents.extend(m['content'] for m in messages)
+        self.original_contents.extend(m.get('original_content', m['content']) for m in messages)
+        self.conversation_titles.extend(m.get('conversation_title') or 'Untitled' for m in messages)
+        self.tool_names.extend(m.get('tool_name') for m in messages)
+        self.tool_ids.extend(m.get('tool_id') for m in messages)
+
+    def record(self, pos: int) -> Dict:
+        """
+        Materialize one row as a message dictionary
+
+        Args:
+            pos: FAISS position of the message
+
+        Returns:
+            Message dictionary with the same keys the fetch query produces
+        """
+        ts = int(self.created_ts[pos])
+        return {
+            'id': int(self.ids[pos]),
+            'conversation_id': int(self.conv_ids[pos]),
+            'role': ROLE_NAMES[int(self.roles[pos])],
+            'content': self.contents[pos],
+            'original_content': self.original_contents[pos],
+            'sequence_number': int(self.sequence_numbers[pos]),
+            'created_at': datetime.fromtimestamp(ts).isoformat() if ts else None,
+            'created_ts': ts,
+            'conversation_title': self.conversation_titles[pos],
+            'tool_name': self.tool_names[pos],
+            'tool_id': self.tool_ids[pos]
+        }
+
+    def to_records(self) -> List[Dict]:
+        """Materialize every row, in position order"""
+        return [self.record(pos) for pos in range(len(self))]
+
+    def positions_in_conversations(self, conversation_ids: List[int]) -> np.ndarray:
+        """
+        Get the positions of all messages in the given conversations
+
+        Args:
+            conversation_ids: Conversation IDs to look up
+
+        Returns:
+            int64 array of positions
+        """
+        if not conversation_ids or not len(self):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self.conv_ids, conversation_ids)).astype(np.int64)
+
+    @property
+    def last_id(self) -> int:
+        """Highest message ID in the store (0 when empty)"""
+        return int(self.ids.max()) if len(self) else 0
@@ -0,0 +1,50 @@
+"""
+Re-ranking of FAISS candidates by message age and role
+"""
+
+import math
+import numpy as np
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Role code -> weight; unknown roles map to the last slot
+ROLE_CODES = {'user': 0, 'assistant': 1}
+ROLE_WEIGHTS = np.array([1.0, 1.0, 1.0], dtype=np.float32)
+UNKNOWN_ROLE_CODE = len(ROLE_WEIGHTS) - 1
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _rerank_kernel(scores, ages_days, role_codes, role_weights, age_weight):
+        out = np.empty_like(scores)
+        for i in prange(scores.shape[0]):
+            out[i] = scores[i] * math.exp(-age_weight * ages_days[i]) * role_weights[role_codes[i]]
+        return out
+else:
+    def _rerank_kernel(scores, ages_days, role_codes, role_weights, age_weight):
+        return scores * np.exp(-age_weight * ages_days).astype(np.float32) * role_weights[role_codes]
+
+
+def rerank(scores: np.ndarray, ages_days: np.ndarray, role_codes: np.ndarray, age_weight: float) -> np.ndarray:
+    """
+    Weight similarity scores by exponential age decay and per-role weights
+
+    Args:
+        scores: float32 similarity scores, shape (k,)
+        ages_days: float32 message ages in days, shape (k,)
+        role_codes: int64 codes from ROLE_CODES, shape (k,)
+        age_weight: Decay rate per day (0 disables age decay)
+
+    Returns:
+        float32 re-ranked scores, shape (k,)
+    """
+    return _rerank_kernel(scores, ages_days, role_codes, ROLE_WEIGHTS, float(age_weight))
+
+
+# Compile once at import so the first search does not pay JIT latency
+if NUMBA_AVAILABLE:
+    rerank(np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.int64), 0.0)
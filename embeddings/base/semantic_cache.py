@@ -0,0 +1,138 @@
+"""
+Semantic LRU cache for embedding search results
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+
+
+class SemanticCache:
+    """
+    LRU cache of search results keyed by normalized query embeddings.
+
+    Exact hits are found by hashing the vector bytes; near-duplicate queries are
+    found through a small inner-product index over the cached query vectors.
+    Entries expire after ttl_seconds, since results filtered by message age go
+    stale with time even when the index does not change.
+
+    All methods are thread-safe; searches and background index updates share
+    one cache.
+    """
+
+    def __init__(self, dimension: int = 384, maxsize: int = 256, min_similarity: float = 0.97,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Initialize the semantic cache
+
+        Args:
+            dimension: Dimension of the cached query vectors
+            maxsize: Maximum number of cached queries (oldest evicted first)
+            min_similarity: Cosine similarity at which a cached query counts as a hit
+            ttl_seconds: Lifetime of a cached entry (None = until evicted or cleared)
+        """
+        self.dimension = dimension
+        self.maxsize = maxsize
+        self.min_similarity = min_similarity
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[np.ndarray, str, List[Dict], float]]" = OrderedDict()
+        self._index = faiss.IndexFlatIP(dimension)
+        self._index_keys: List[bytes] = []
+        self._index_dirty = False
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _make_key(vector: np.ndarray, params_key: str) -> bytes:
+        """Hash a query vector together with the search parameters"""
+        h = hashlib.blake2b(vector.tobytes(), digest_size=16)
+        h.update(params_key.encode('utf-8'))
+        return h.digest()
+
+    def _rebuild_index(self):
+        """Rebuild the lookup index after inserts or evictions"""
+        self._index.reset()
+        self._index_keys = list(self._entries.keys())
+        if self._index_keys:
+            self._index.add(np.vstack([entry[0] for entry in self._entries.values()]))
+        self._index_dirty = False
+
+    def get(self, vector: np.ndarray, params_key: str = "") -> Optional[List[Dict]]:
+        """
+        Look up cached results for a query vector
+
+        Args:
+            vector: L2-normalized query vector of shape (1, d)
+            params_key: String identifying the search parameters
+
+        Returns:
+            Copy of the cached results, or None on a miss
+        """
+        with self._lock:
+            key = self._make_key(vector, params_key)
+
+            if key not in self._entries and self._entries:
+                # No exact match - look for a near-duplicate query with the same parameters
+                if self._index_dirty:
+                    self._rebuild_index()
+                n = min(8, len(self._index_keys))
+                scores, positions = self._index.search(vector, n)
+                key = None
+                for score, pos in zip(scores[0], positions[0]):
+                    if pos == -1 or score < self.min_similarity:
+                        break
+                    candidate = self._index_keys[pos]
+                    if self._entries[candidate][1] == params_key:
+                        key = candidate
+                        break
+
+            if key is None or key not in self._entries:
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds is not None and time.monotonic() - self._entries[key][3] > self.ttl_seconds:
+                del self._entries[key]
+                self._index_dirty = True
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(result) for result in self._entries[key][2]]
+
+    def put(self, vector: np.ndarray, results: List[Dict], params_key: str = ""):
+        """
+        Cache results for a query vector, evicting the least recently used entry on overflow
+
+        Args:
+            vector: L2-normalized query vector of shape (1, d)
+            results: Search results to cache
+            params_key: String identifying the search parameters
+        """
+        with self._lock:
+            key = self._make_key(vector, params_key)
+            self._entries[key] = (np.array(vector, dtype='float32').reshape(1, -1), params_key,
+                                  [dict(result) for result in results], time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+            self._index_dirty = True
+
+    def clear(self):
+        """Drop all cached results (call whenever the underlying index changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._index.reset()
+            self._index_keys = []
+            self._index_dirty = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
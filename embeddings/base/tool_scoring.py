@@ -0,0 +1,66 @@
+"""
+Multi-factor scoring of FAISS tool candidates
+"""
+
+import numpy as np
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _score_kernel(semantic_scores, tool_tokens, desc_tokens, overlap, query_tokens, query_words):
+        n = semantic_scores.shape[0]
+        length_score = np.empty(n, dtype=np.float64)
+        description_factor = np.empty(n, dtype=np.float64)
+        keyword_bonus = np.empty(n, dtype=np.float64)
+        combined_score = np.empty(n, dtype=np.float64)
+        for i in prange(n):
+            ratio = min(max(query_tokens / max(1, tool_tokens[i]), 0.33), 3.0)
+            length_score[i] = 1.0 - abs(1.0 - ratio) / 2.0
+            description_factor[i] = min(1.0, desc_tokens[i] / max(1, query_tokens))
+            keyword_bonus[i] = overlap[i] / max(1, query_words) * 0.2
+            combined_score[i] = (0.50 * semantic_scores[i] + 0.25 * length_score[i]
+                                 + 0.15 * description_factor[i] + 0.10 * keyword_bonus[i])
+        return length_score, description_factor, keyword_bonus, combined_score
+else:
+    def _score_kernel(semantic_scores, tool_tokens, desc_tokens, overlap, query_tokens, query_words):
+        length_ratio = query_tokens / np.maximum(1, tool_tokens)
+        length_score = 1.0 - np.abs(1.0 - np.clip(length_ratio, 0.33, 3.0)) / 2.0
+        description_factor = np.minimum(1.0, desc_tokens / max(1, query_tokens))
+        keyword_bonus = overlap / max(1, query_words) * 0.2
+        combined_score = (
+            0.50 * semantic_scores +           # Primary: semantic similarity
+            0.25 * length_score +              # Secondary: length matching
+            0.15 * description_factor +        # Tertiary: description depth
+            0.10 * keyword_bonus               # Bonus: direct keyword matches
+        )
+        return length_score, description_factor, keyword_bonus, combined_score
+
+
+def score_candidates(semantic_scores: np.ndarray, tool_tokens: np.ndarray, desc_tokens: np.ndarray,
+                     overlap: np.ndarray, query_tokens: int, query_words: int):
+    """
+    Combine semantic, length, description and keyword factors for tool candidates
+
+    Args:
+        semantic_scores: Cosine similarities rescaled to 0 at the cutoff and 1 for an exact match, shape (k,)
+        tool_tokens: int32 query-example token counts per candidate, shape (k,)
+        desc_tokens: int32 description token counts per candidate, shape (k,)
+        overlap: int64 query words found in each candidate's examples, shape (k,)
+        query_tokens: Token count of the query
+        query_words: Distinct lowercased words in the query
+
+    Returns:
+        (length_score, description_factor, keyword_bonus, combined_score), float64 arrays of shape (k,)
+    """
+    return _score_kernel(semantic_scores, tool_tokens, desc_tokens, overlap, int(query_tokens), int(query_words))
+
+
+# Compile once at import so the first query does not pay JIT latency
+if NUMBA_AVAILABLE:
+    score_candidates(np.ones(1, dtype=np.float32), np.ones(1, dtype=np.int32), np.ones(1, dtype=np.int32),
+                     np.zeros(1, dtype=np.int64), 1, 1)
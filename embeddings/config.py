@@ -3,30 +3,78 @@ Configuration management for embeddings system
 """
 
 from dataclasses import dataclass
+from functools import lru_cache
 import os
 from typing import Optional
 
 
+@lru_cache(maxsize=None)
+def _ensure_dirs(*dirs: str) -> None:
+    """Create index directories once per process for each distinct set of paths"""
+    for directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+
+
 @dataclass
 class EmbeddingConfig:
     """Configuration for embedding system"""
     
     # Model settings
     model_name: str = "all-MiniLM-L6-v2"
-    distance_threshold: float = 1.5
-    max_message_length: int = 500
+    distance_threshold: float = 1.5  # Squared L2 cutoff (= 2 - 2 * cosine on unit vectors); query_tools_with_ranking allows 1.2x, i.e. cosine >= 0.1
+    max_message_length: int = 500  # Characters kept per message; ~max_seq_length tokens
+    max_seq_length: int = 128  # Encoder token limit; the tokenizer truncates beyond it
     enable_persistence: bool = True
     
+    # Encoding settings
+    device: Optional[str] = None  # None = auto-detect cuda/mps/cpu
+    encode_batch_size: int = 256
+    encode_fp16: bool = True  # Run the bulk-encoding model in fp16 on CUDA
+    query_on_cpu: bool = True  # Encode single queries with a CPU copy of the model
+    encode_chunk_size: int = 1024  # Texts per chunk when streaming encode -> index add
+    query_cache_size: int = 512  # Recent query vectors kept in memory (LRU)
+    torch_num_threads: Optional[int] = None  # Intra-op CPU threads for encoding; None keeps torch's default
+    mmap: bool = True  # Memory-map persisted indexes read-only on load instead of copying into RAM
+    index_validation_ttl: float = 60  # Seconds a validated tool index is trusted without rechecking
+    
     # Tool-specific settings
     tool_search_k: int = 15
     tool_min_semantic_score: float = 0.4
     tool_max_candidates: int = 10
+    tool_use_gpu: bool = False  # Run batched tool searches on a GPU copy of the index when one is available
+    tool_numpy_knn_max: int = 256  # Tool indexes up to this size are searched with one NumPy matmul
+    tool_hnsw_min_vectors: int = 64  # Tool indexes smaller than this stay flat (exact)
+    tool_hnsw_ef_construction: int = 40
+    tool_hnsw_ef_search: int = 16  # Raised to tool_search_k when smaller
+    tool_quantization: str = "fp32"  # "fp32", "fp16" or "sq8"; thresholds are tuned on exact fp32 similarities
     
     # Message-specific settings
     message_search_k: int = 10
-    message_min_similarity: float = 0.6
+    message_min_similarity: float = 0.6  # Cosine similarity, compared as score >= threshold
     message_max_age_days: int = 7
     message_max_context_pairs: int = 3
+    message_fetch_page_size: int = 1000
+    message_age_weight: float = 0.0  # Per-day exponential decay applied when ranking results
+    message_update_interval: float = 30.0  # Min seconds between background incremental updates
+    message_delta_snapshot_ratio: float = 0.1  # Rewrite the full index once the delta log exceeds this share
+    message_retrain_growth: float = 4.0  # Rebuild a trained quantizer once the index grows this many times past its training set
+    
+    # Semantic search cache
+    semantic_cache_size: int = 256
+    semantic_cache_min_similarity: float = 0.97
+    semantic_cache_ttl: float = 60.0  # Seconds before a cached search result is recomputed
+    
+    # ANN settings (HNSW graph for large message indexes)
+    use_hnsw: bool = True
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    hnsw_min_vectors: int = 2000  # Brute-force flat scan is faster below this size
+    index_add_chunk_size: int = 10000
+    
+    # Vector storage: "fp32" (exact), "fp16" (half precision), "sq8" (int8 scalar quantizer) or "pq" (product quantizer)
+    quantization: str = "sq8"
+    pq_m: int = 48  # Sub-quantizers for "pq"; must divide the vector dimension
     
     # Index settings
     tool_index_dir: str = "./embeddings/indexes/tools"
@@ -34,6 +82,5 @@ class EmbeddingConfig:
     
     def __post_init__(self):
         """Post-initialization processing"""
-        # Ensure directories exist
-        os.makedirs(self.tool_index_dir, exist_ok=True)
-        os.makedirs(self.message_index_dir, exist_ok=True)
+        # Ensure directories exist (only checked on disk the first time)
+        _ensure_dirs(self.tool_index_dir, self.message_index_dir)
@@ -8,18 +8,59 @@ import faiss
 import json
 import hashlib
 import time
+import threading
+import atexit
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from sentence_transformers import SentenceTransformer
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 
 from utils.database import db_manager
 from logger import logger
 from embeddings.base.faiss_persistence import FaissPersistenceManager
 from embeddings.base.embedding_manager import BaseEmbeddingManager
+from embeddings.base.semantic_cache import SemanticCache
+from embeddings.base import delta_log
+from embeddings.base.message_store import MessageStore, ROLE_NAMES
+from embeddings.base.rerank import rerank
 from embeddings.config import EmbeddingConfig
 
 
+# Only embed user and assistant messages (not system/tool messages) and skip
+# very short messages that don't provide meaningful context. The length check
+# also excludes command words such as 'exit', 'help' and 'clear'.
+EMBEDDABLE_MESSAGE_FILTER = """
+                AND m.role IN ('user', 'assistant')
+                AND LENGTH(m.content) >= 10
+"""
+
+
+@lru_cache(maxsize=None)
+def _ensure_embeddable_message_index() -> None:
+    """Create the partial index matching EMBEDDABLE_MESSAGE_FILTER (once per process)"""
+    try:
+        db_manager.execute_command(
+            "CREATE INDEX IF NOT EXISTS idx_messages_embeddable ON messages (id) "
+            "WHERE role IN ('user', 'assistant') AND LENGTH(content) >= 10"
+        )
+    except Exception as e:
+        logger.log_error("embeddable_message_index_failed", str(e), "Failed to ensure idx_messages_embeddable")
+
+
+@lru_cache(maxsize=None)
+def _ensure_assistant_reply_index() -> None:
+    """Create the partial index used to look up assistant replies by parent (once per process)"""
+    try:
+        db_manager.execute_command(
+            "CREATE INDEX IF NOT EXISTS idx_messages_assistant_reply "
+            "ON messages (parent_message_id, sequence_number) WHERE role = 'assistant'"
+        )
+    except Exception as e:
+        logger.log_error("assistant_reply_index_failed", str(e), "Failed to ensure idx_messages_assistant_reply")
+
+
 class MessageEmbeddingManager(BaseEmbeddingManager):
     """
     Manages FAISS-based semantic search for conversation messages
@@ -45,26 +86,69 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         )
         
         # Index management
-        self.message_mapping: Dict[int, Dict] = {}  # Maps FAISS index position to message data
+        self.message_store = MessageStore()  # Message metadata by FAISS index position
         self.last_indexed_message_id = 0
         self.index_build_time = None
+        self.index_mmapped = False  # Read-only mapping; reloaded in full before the first add
+        self.training_size = 0  # Vectors the quantizer was trained on (0 = no training needed)
+        
+        # Incremental updates run off the search path; the lock guards index and mapping mutation
+        self._index_lock = threading.RLock()
+        self._update_thread: Optional[threading.Thread] = None
+        self._last_update_ts = 0.0
+        self._closing = threading.Event()
+        
+        # Messages appended to the delta log since the last full snapshot
+        self._snapshot_count = 0
+        self._delta_count = 0
+        
+        # Cache of recent search results keyed by query embedding
+        self.search_cache = SemanticCache(
+            maxsize=self.config.semantic_cache_size,
+            min_similarity=self.config.semantic_cache_min_similarity,
+            ttl_seconds=self.config.semantic_cache_ttl
+        )
         
         # Persistence
         if self.enable_persistence:
-            self.persistence_manager = FaissPersistenceManager(self.config.message_index_dir)
+            self.persistence_manager = FaissPersistenceManager(self.config.message_index_dir, mmap=self.config.mmap)
             self.persistence_manager.index_file = self.persistence_manager.index_dir / "index.faiss"
             self.persistence_manager.metadata_file = self.persistence_manager.index_dir / "metadata.json"
-            self.persistence_manager.mapping_file = self.persistence_manager.index_dir / "mapping.json"
+            self.persistence_manager.mapping_file = self.persistence_manager.index_dir / "mapping.json"  # Legacy layout
+            self.persistence_manager.mapping_arrays_file = self.persistence_manager.index_dir / "mapping_arrays.npz"
+            self.persistence_manager.mapping_text_file = self.persistence_manager.index_dir / "mapping_text.json"
+            self.persistence_manager.delta_log_file = self.persistence_manager.index_dir / "delta.log"
+            # Two-file delta layout; its rows are not in the snapshot and are re-fetched from the database
+            self.persistence_manager.legacy_delta_files = (
+                self.persistence_manager.index_dir / "delta_vectors.f32",
+                self.persistence_manager.index_dir / "mapping_delta.jsonl"
+            )
         
         # Initialize index
         self._initialize_index()
+        
+        # Let a running update finish its page before the interpreter tears down
+        atexit.register(self.close)
+    
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop background updates and wait for a running one to finish
+        
+        The update thread stops after the page it is currently adding, so the
+        index, mapping and delta log are left consistent.
+        
+        Args:
+            timeout: Seconds to wait for the update thread (None waits until it finishes)
+        """
+        self._closing.set()
+        thread = self._update_thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
     
     def _build_index(self, vectors, mapping):
         """Build FAISS index from vectors and mapping"""
-        d = vectors.shape[1]
-        index = faiss.IndexFlatL2(d)
-        index.add(vectors)
-        return index
+        index = super()._create_empty_index(vectors.shape[1], expected_size=len(vectors))
+        return self._add_in_chunks(index, vectors)
     
     def _search_index(self, query_vector, k):
         """Search index with query vector"""
@@ -75,16 +159,19 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         try:
             if self.enable_persistence:
                 # Try to load existing index
-                loaded_index, loaded_mapping, is_valid = self._load_persisted_index()
+                loaded_index, loaded_store, is_valid = self._load_persisted_index()
                 
-                if is_valid and loaded_index and loaded_mapping:
-                    self.index = loaded_index
-                    self.message_mapping = {int(k): v for k, v in loaded_mapping.items()}
-                    self.last_indexed_message_id = max([msg['id'] for msg in self.message_mapping.values()]) if self.message_mapping else 0
+                if is_valid and loaded_index and loaded_store:
+                    self.index = self._configure_index(loaded_index)
+                    self.index_mmapped = self.persistence_manager.will_mmap(type(loaded_index).__name__)
+                    self.message_store = loaded_store
+                    self._snapshot_count = len(self.message_store)
+                    self.last_indexed_message_id = self.message_store.last_id
+                    self._apply_delta_log()
                     
                     logger.log_system_event(
                         "message_index_loaded",
-                        f"Loaded message index with {len(self.message_mapping)} messages"
+                        f"Loaded message index with {len(self.message_store)} messages"
                     )
                     
                     # Check for new messages and update index
@@ -99,15 +186,15 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
             # Create empty index as fallback
             self._create_empty_index()
     
-    def _load_persisted_index(self) -> Tuple[Optional[faiss.Index], Optional[Dict], bool]:
+    def _load_persisted_index(self) -> Tuple[Optional[faiss.Index], Optional[MessageStore], bool]:
         """Load persisted index if available and valid"""
         try:
+            pm = self.persistence_manager
+            columnar = pm.mapping_arrays_file.exists() and pm.mapping_text_file.exists()
+            
             # Check if index files exist
-            if not all(f.exists() for f in [
-                self.persistence_manager.index_file,
-                self.persistence_manager.metadata_file,
-                self.persistence_manager.mapping_file
-            ]):
+            if not (pm.index_file.exists() and pm.metadata_file.exists()
+                    and (columnar or pm.mapping_file.exists())):
                 return None, None, False
             
             # Load metadata
@@ -122,47 +209,116 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
                 )
                 return None, None, False
             
-            # Load index and mapping
-            index = faiss.read_index(str(self.persistence_manager.index_file))
+            # Indexes persisted before the switch to cosine similarity used L2 distance
+            if metadata.get("metric") != "inner_product":
+                logger.log_system_event(
+                    "message_index_metric_mismatch",
+                    f"Index metric {metadata.get('metric', 'l2')} != current inner_product"
+                )
+                return None, None, False
+            
+            # Compare with what a build of this size would use (e.g. an index started
+            # empty is fp32 until there are vectors to train the quantizer on)
+            expected_quantization = self._effective_quantization(metadata.get("message_count", 0))
+            if metadata.get("quantization", "fp32") != expected_quantization:
+                logger.log_system_event(
+                    "message_index_quantization_mismatch",
+                    f"Index quantization {metadata.get('quantization', 'fp32')} != expected {expected_quantization}"
+                )
+                return None, None, False
+            
+            # Graph parameters are baked into an HNSW index; rebuild if the config changed
+            if metadata.get("hnsw_m") is not None and metadata["hnsw_m"] != self.config.hnsw_m:
+                logger.log_system_event(
+                    "message_index_hnsw_mismatch",
+                    f"Index HNSW M {metadata['hnsw_m']} != current {self.config.hnsw_m}"
+                )
+                return None, None, False
             
-            with open(self.persistence_manager.mapping_file, 'r') as f:
-                mapping = json.load(f)
+            # Load index and mapping
+            index = self.persistence_manager.read_index(index_type=metadata.get("index_type"))
+            self.training_size = metadata.get("training_size", metadata.get("message_count", 0))
             
-            return index, mapping, True
+            return index, self._read_message_store(columnar), True
             
         except Exception as e:
             logger.log_error("message_index_load_failed", str(e), "Failed to load persisted message index")
             return None, None, False
     
+    def _read_message_store(self, columnar: bool) -> MessageStore:
+        """
+        Read the persisted message mapping
+        
+        Args:
+            columnar: Whether the .npz/JSON column files exist (else read legacy mapping.json)
+            
+        Returns:
+            MessageStore in FAISS position order
+        """
+        pm = self.persistence_manager
+        if columnar:
+            with np.load(pm.mapping_arrays_file) as arrays, open(pm.mapping_text_file, 'r') as f:
+                return MessageStore.from_columns(arrays, json.load(f))
+        
+        # Legacy layout: a list of message dicts, or an older {position: message} dict
+        with open(pm.mapping_file, 'r') as f:
+            mapping = json.load(f)
+        if isinstance(mapping, dict):
+            mapping = [msg for _, msg in sorted(mapping.items(), key=lambda item: int(item[0]))]
+        return MessageStore.from_records(mapping)
+    
+    def _write_message_store(self):
+        """Write the message store as NumPy columns (.npz) plus a JSON object of text columns"""
+        pm = self.persistence_manager
+        arrays, text = self.message_store.columns()
+        pm._write_atomic(pm.mapping_arrays_file, lambda f: np.savez(f, **arrays))
+        pm.write_json_atomic(pm.mapping_text_file, text)
+        pm.mapping_file.unlink(missing_ok=True)
+    
     def _build_index_from_scratch(self):
         """Build FAISS index from all messages in database"""
         try:
             logger.log_system_event("message_index_build_start", "Building message index from scratch")
             start_time = time.time()
             
-            # Get all messages suitable for embedding
-            messages = self._fetch_messages_for_embedding()
-            
-            if not messages:
+            # Size the index up front so its type is chosen before the first add
+            expected_size = self._count_messages_for_embedding()
+            if not expected_size:
                 self._create_empty_index()
                 return
             
-            # Generate embeddings
-            embeddings = self._generate_embeddings_for_messages(messages)
+            # Build into a new index so searches keep using the current one meanwhile
+            dimension = self.embedding_model.get_sentence_embedding_dimension()
+            index = super()._create_empty_index(dimension, expected_size=expected_size)
             
-            # Create FAISS index
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(dimension)
-            self.index.add(embeddings)
+            # Stream pages through the pipeline: fetch page N+2, encode page N+1, add page N
+            messages = []
             
-            # Create mapping
-            self.message_mapping = {i: msg for i, msg in enumerate(messages)}
-            self.last_indexed_message_id = max([msg['id'] for msg in messages])
-            self.index_build_time = time.time() - start_time
+            def text_pages():
+                for page in self._iter_message_pages():
+                    messages.extend(page)
+                    yield self._texts_for_messages(page)
             
-            # Save to disk if persistence enabled
-            if self.enable_persistence:
-                self._save_index_to_disk(messages)
+            _, training_size = self._stream_into_index(index, self._encode_chunks_iter(text_pages()), expected_size)
+            
+            if not messages:
+                self._create_empty_index()
+                return
+            
+            with self._index_lock:
+                self.index = index
+                self.index_mmapped = False
+                self.training_size = training_size
+                
+                # Create mapping
+                self.message_store = MessageStore.from_records(messages)
+                self.search_cache.clear()
+                self.last_indexed_message_id = max([msg['id'] for msg in messages])
+                self.index_build_time = time.time() - start_time
+                
+                # Save to disk if persistence enabled
+                if self.enable_persistence:
+                    self._save_index_to_disk()
             
             logger.log_system_event(
                 "message_index_build_complete",
@@ -173,34 +329,56 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
             logger.log_error("message_index_build_failed", str(e), "Failed to build message index")
             self._create_empty_index()
     
-    def _fetch_messages_for_embedding(self, since_message_id: int = 0) -> List[Dict]:
+    def _count_messages_for_embedding(self, since_message_id: int = 0) -> int:
+        """
+        Count messages that _fetch_messages_for_embedding would return
+        
+        Args:
+            since_message_id: Only count messages with ID > this value
+            
+        Returns:
+            Number of embeddable messages
+        """
+        try:
+            _ensure_embeddable_message_index()
+            query = f"""
+                SELECT COUNT(*)
+                FROM messages m
+                WHERE m.id > %s
+                {EMBEDDABLE_MESSAGE_FILTER}
+            """
+            result = db_manager.execute_query(query, (since_message_id,))
+            return result[0][0] if result else 0
+            
+        except Exception as e:
+            logger.log_error("message_count_failed", str(e), "Failed to count messages for embedding")
+            return 0
+    
+    def _fetch_messages_for_embedding(self, since_message_id: int = 0, limit: Optional[int] = None) -> List[Dict]:
         """
         Fetch messages from database suitable for embedding
         
         Args:
             since_message_id: Only fetch messages with ID > this value
+            limit: Maximum number of messages to fetch (None = no limit)
             
         Returns:
             List of message dictionaries
         """
         try:
-            # Only embed user and assistant messages (not system/tool messages)
-            # Also filter out very short messages that don't provide meaningful context
-            query = """
+            _ensure_embeddable_message_index()
+            query = f"""
                 SELECT m.id, m.conversation_id, m.role, m.content, m.sequence_number, 
                        m.created_at, c.title as conversation_title, m.tool_name, m.tool_id
                 FROM messages m
                 JOIN conversations c ON m.conversation_id = c.id
                 WHERE m.id > %s
-                AND m.role IN ('user', 'assistant')
-                AND LENGTH(m.content) >= 10
-                AND m.content NOT LIKE 'exit'
-                AND m.content NOT LIKE 'help'
-                AND m.content NOT LIKE 'clear'
+                {EMBEDDABLE_MESSAGE_FILTER}
                 ORDER BY m.id ASC
+                LIMIT %s
             """
             
-            result = db_manager.execute_query(query, (since_message_id,))
+            result = db_manager.execute_query(query, (since_message_id, limit))
             
             messages = []
             for row in result:
@@ -217,6 +395,7 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
                     'original_content': row[3],  # Keep original for retrieval
                     'sequence_number': row[4],
                     'created_at': row[5].isoformat() if row[5] else None,
+                    'created_ts': int(row[5].timestamp()) if row[5] else 0,  # Unix seconds for filtering
                     'conversation_title': row[6] or 'Untitled',
                     'tool_name': row[7],  # NEW: Include tool name
                     'tool_id': row[8]     # NEW: Include tool ID
@@ -229,112 +408,303 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
             logger.log_error("message_fetch_failed", str(e), "Failed to fetch messages for embedding")
             return []
     
-    def _generate_embeddings_for_messages(self, messages: List[Dict]) -> np.ndarray:
+    def _iter_message_pages(self, since_message_id: int = 0, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Yield messages in ID-ordered pages, prefetching the next page in the background
+        
+        Args:
+            since_message_id: Only fetch messages with ID > this value
+            page_size: Messages per page (defaults to config)
+            
+        Yields:
+            Lists of message dictionaries
+        """
+        page_size = page_size or self.config.message_fetch_page_size
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self._fetch_messages_for_embedding, since_message_id, page_size)
+            while pending is not None:
+                page = pending.result()
+                if not page:
+                    return
+                
+                # A full page means there may be more rows - start fetching them now
+                pending = None
+                if len(page) == page_size:
+                    pending = executor.submit(self._fetch_messages_for_embedding, page[-1]['id'], page_size)
+                
+                yield page
+    
+    def _texts_for_messages(self, messages: List[Dict]) -> List[str]:
         """
-        Generate embeddings for a list of messages
+        Build the enhanced text embedded for each message
         
         Args:
             messages: List of message dictionaries
             
         Returns:
-            NumPy array of embeddings
+            List of texts including role and conversation context
         """
-        try:
-            # Create enhanced text for embedding that includes context
-            texts_to_embed = []
+        texts_to_embed = []
+        
+        for msg in messages:
+            # Embed a plain character-capped prefix (no "..." marker); the tokenizer
+            # truncates to max_seq_length tokens, so longer text would be discarded anyway
+            text = msg.get('original_content', msg['content'])[:self.max_message_length]
             
-            for msg in messages:
-                # Create enhanced text with role and conversation context
-                enhanced_text = f"{msg['role']}: {msg['content']}"
-                
-                # Add conversation title for additional context
-                if msg['conversation_title'] and msg['conversation_title'] != 'Untitled':
-                    enhanced_text = f"[{msg['conversation_title']}] {enhanced_text}"
-                
-                texts_to_embed.append(enhanced_text)
+            # Create enhanced text with role and conversation context
+            enhanced_text = f"{msg['role']}: {text}"
             
-            # Generate embeddings
-            embeddings = self.embedding_model.encode(texts_to_embed, show_progress_bar=False)
-            return np.array(embeddings, dtype='float32')
+            # Add conversation title for additional context
+            if msg['conversation_title'] and msg['conversation_title'] != 'Untitled':
+                enhanced_text = f"[{msg['conversation_title']}] {enhanced_text}"
             
-        except Exception as e:
-            logger.log_error("embedding_generation_failed", str(e), "Failed to generate message embeddings")
-            raise
+            texts_to_embed.append(enhanced_text)
+        
+        return texts_to_embed
     
     def _create_empty_index(self):
         """Create an empty FAISS index"""
         # Create with standard embedding dimension
         dimension = 384  # all-MiniLM-L6-v2 dimension
-        self.index = faiss.IndexFlatL2(dimension)
-        self.message_mapping = {}
+        self.index = super()._create_empty_index(dimension)
+        self.index_mmapped = False
+        self.training_size = 0
+        self.message_store = MessageStore()
         self.last_indexed_message_id = 0
+        self.search_cache.clear()
         
         logger.log_system_event("empty_message_index_created", "Created empty message index")
     
+    def _schedule_incremental_update(self):
+        """
+        Start a background incremental update if the update interval has elapsed
+        
+        At most one update thread runs at a time; searches never wait on the
+        database or the encoder.
+        """
+        now = time.time()
+        if self._closing.is_set() or now - self._last_update_ts < self.config.message_update_interval:
+            return
+        if self._update_thread is not None and self._update_thread.is_alive():
+            return
+        
+        self._last_update_ts = now
+        self._update_thread = threading.Thread(
+            target=self._update_index_incrementally,
+            name="message-index-update",
+            daemon=True
+        )
+        self._update_thread.start()
+    
     def _update_index_incrementally(self):
-        """Update index with new messages since last build"""
+        """
+        Update index with new messages since last build
+        
+        New messages are processed page by page: the next page is fetched and
+        encoded on worker threads while the current one is added, so the database
+        wait overlaps the encoder and only a few pages are held in memory.
+        """
         try:
-            # Fetch new messages
-            new_messages = self._fetch_messages_for_embedding(self.last_indexed_message_id)
+            # Fetch and encode outside the lock so concurrent searches are not blocked
+            since_message_id = self.last_indexed_message_id
+            pending_pages = deque()
+            added = 0
+            
+            def text_pages():
+                for page in self._iter_message_pages(since_message_id):
+                    pending_pages.append(page)
+                    yield self._texts_for_messages(page)
+            
+            for new_embeddings in self._encode_chunks_iter(text_pages()):
+                new_messages = pending_pages.popleft()
+                
+                with self._index_lock:
+                    # A rebuild or another update may have indexed these messages meanwhile
+                    if self._closing.is_set() or self.last_indexed_message_id != since_message_id:
+                        break
+                    
+                    # Add to existing index
+                    self._ensure_writable_index()
+                    self.index.add(new_embeddings)
+                    
+                    # Update mapping
+                    self.message_store.append(new_messages)
+                    
+                    # Update last indexed ID
+                    self.last_indexed_message_id = max([msg['id'] for msg in new_messages])
+                    since_message_id = self.last_indexed_message_id
+                    
+                    # Cached results no longer reflect the index
+                    self.search_cache.clear()
+                    
+                    # Persist only the new rows until the delta grows past the snapshot threshold
+                    if self.enable_persistence:
+                        delta_limit = self.config.message_delta_snapshot_ratio * self._snapshot_count
+                        if self._delta_count + len(new_messages) > delta_limit:
+                            self._save_index_to_disk()
+                        else:
+                            self._append_delta_log(new_messages, new_embeddings)
+                
+                added += len(new_messages)
             
-            if not new_messages:
-                return
+            if added:
+                logger.log_system_event(
+                    "message_index_updated",
+                    f"Added {added} new messages to index"
+                )
             
-            # Generate embeddings for new messages
-            new_embeddings = self._generate_embeddings_for_messages(new_messages)
+            # Index type and quantizer are chosen at build time; rebuild once they no longer fit
+            reason = self._rebuild_reason()
+            if reason and not self._closing.is_set():
+                logger.log_system_event("message_index_outgrown", f"Rebuilding message index: {reason}")
+                self._build_index_from_scratch()
             
-            # Add to existing index
-            start_idx = len(self.message_mapping)
-            self.index.add(new_embeddings)
+        except Exception as e:
+            logger.log_error("message_index_update_failed", str(e), "Failed to update message index")
+    
+    def _rebuild_reason(self) -> Optional[str]:
+        """
+        Explain why the index no longer suits the number of indexed messages
+        
+        Returns:
+            Reason for a rebuild, or None if the index is still appropriate
+        """
+        size = len(self.message_store)
+        if not size:
+            return None
+        
+        # A flat scan is linear in history size; switch to HNSW once it pays off
+        if self.config.use_hnsw and size >= self.config.hnsw_min_vectors and not hasattr(self.index, 'hnsw'):
+            return f"{size} messages in a flat index (HNSW from {self.config.hnsw_min_vectors})"
+        
+        quantization = self._index_quantization(self.index)
+        expected_quantization = self._effective_quantization(size)
+        if quantization != expected_quantization:
+            return f"quantization {quantization} != expected {expected_quantization}"
+        
+        # A quantizer trained on few vectors clips the value ranges of later ones
+        if (quantization in ("sq8", "pq") and self.training_size < self._training_target(size)
+                and size >= self.config.message_retrain_growth * self.training_size):
+            return f"{size} messages, quantizer trained on {self.training_size}"
+        
+        return None
+    
+    def _append_delta_log(self, messages: List[Dict], embeddings: np.ndarray):
+        """
+        Append new vectors and mapping rows to the delta log instead of rewriting the index
+        
+        Each vector is stored in one checksummed record together with its mapping
+        row, so the two can never drift apart. The batch is written with a single
+        fsynced write; on load the log is replayed on top of the last full snapshot.
+        
+        Args:
+            messages: Newly indexed messages
+            embeddings: Their vectors, shape (len(messages), d)
+        """
+        try:
+            delta_log.append_records(self.persistence_manager.delta_log_file, embeddings, messages)
             
-            # Update mapping
-            for i, msg in enumerate(new_messages):
-                self.message_mapping[start_idx + i] = msg
+            self._delta_count += len(messages)
+            logger.log_system_event(
+                "message_index_delta_appended",
+                f"Appended {len(messages)} messages to delta log ({self._delta_count} since snapshot)"
+            )
+            
+        except Exception as e:
+            # Rows missing from the log are fetched again from the database after a restart
+            logger.log_error("message_index_delta_failed", str(e), "Failed to append message index delta")
+    
+    def _apply_delta_log(self):
+        """
+        Replay the delta log onto the loaded snapshot
+        
+        A torn or corrupt tail is cut off so later appends start on a record
+        boundary. Rows already present in the snapshot (a crash between a full
+        save and the delta cleanup) are skipped.
+        """
+        pm = self.persistence_manager
+        for path in pm.legacy_delta_files:
+            path.unlink(missing_ok=True)
+        if not pm.delta_log_file.exists():
+            return
+        
+        try:
+            vectors, rows, valid_length = delta_log.read_records(pm.delta_log_file, self.index.d)
+            if delta_log.truncate_to(pm.delta_log_file, valid_length):
+                logger.log_system_event(
+                    "message_index_delta_truncated",
+                    f"Discarded damaged delta log tail after {len(rows)} records"
+                )
             
-            # Update last indexed ID
-            self.last_indexed_message_id = max([msg['id'] for msg in new_messages])
+            keep = [i for i in range(len(rows)) if rows[i]['id'] > self.last_indexed_message_id]
+            self._delta_count = len(keep)
+            if not keep:
+                return
             
-            # Save updated index
-            if self.enable_persistence:
-                all_messages = list(self.message_mapping.values())
-                self._save_index_to_disk(all_messages)
+            self._ensure_writable_index()
+            self.index.add(vectors[keep])
+            self.message_store.append([rows[i] for i in keep])
             
+            self.last_indexed_message_id = max(rows[i]['id'] for i in keep)
             logger.log_system_event(
-                "message_index_updated",
-                f"Added {len(new_messages)} new messages to index"
+                "message_index_delta_applied",
+                f"Replayed {len(keep)} messages from delta log"
             )
             
         except Exception as e:
-            logger.log_error("message_index_update_failed", str(e), "Failed to update message index")
+            # The snapshot alone is consistent; the incremental update re-fetches the rest
+            logger.log_error("message_index_delta_load_failed", str(e), "Failed to replay message index delta")
+            self._clear_delta_log()
+    
+    def _clear_delta_log(self):
+        """Remove the delta log after a full snapshot has been written"""
+        self.persistence_manager.delta_log_file.unlink(missing_ok=True)
+        self._delta_count = 0
     
-    def _save_index_to_disk(self, messages: List[Dict]):
-        """Save index and metadata to disk"""
+    def _ensure_writable_index(self):
+        """Replace a memory-mapped index with a fully loaded copy so it can be added to"""
+        if self.index_mmapped:
+            self.index = self._configure_index(self.persistence_manager.read_index(mmap=False))
+            self.index_mmapped = False
+    
+    def _save_index_to_disk(self):
+        """Save index, message mapping and metadata to disk"""
         try:
+            message_count = len(self.message_store)
+            
             # Save FAISS index
-            faiss.write_index(self.index, str(self.persistence_manager.index_file))
+            self.persistence_manager.write_index(self.index)
             
-            # Save mapping
-            with open(self.persistence_manager.mapping_file, 'w') as f:
-                json.dump(self.message_mapping, f, indent=2, default=str)
+            # Save mapping; positions are implicit in column order
+            self._write_message_store()
             
             # Save metadata
             metadata = {
                 "index_version": "1.0",
                 "created_at": datetime.now().isoformat(),
                 "embedding_model": self.config.model_name,
-                "message_count": len(messages),
+                "message_count": message_count,
                 "last_indexed_message_id": self.last_indexed_message_id,
                 "vector_dimension": self.index.d,
+                "metric": "inner_product",
+                "quantization": self._index_quantization(self.index),
+                "training_size": self.training_size,
+                "index_type": type(self.index).__name__,
+                "hnsw_m": self.config.hnsw_m if hasattr(self.index, 'hnsw') else None,
                 "max_message_length": self.max_message_length,
                 "index_build_time": self.index_build_time
             }
             
-            with open(self.persistence_manager.metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self.persistence_manager.write_json_atomic(self.persistence_manager.metadata_file, metadata)
+            
+            # The snapshot now contains every delta row
+            self._snapshot_count = message_count
+            self._clear_delta_log()
             
             logger.log_system_event(
                 "message_index_saved",
-                f"Saved message index with {len(messages)} messages"
+                f"Saved message index with {message_count} messages"
             )
             
         except Exception as e:
@@ -365,61 +735,42 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         max_age_days = max_age_days or self.config.message_max_age_days
         
         try:
+            # Pick up new messages in the background; this search uses the current index
+            self._schedule_incremental_update()
+            
             if not self.index or self.index.ntotal == 0:
                 return []
             
             start_time = time.time()
             
-            # Update index with any new messages
-            self._update_index_incrementally()
-            
             # Generate query embedding
             query_embedding = self._encode_query(query)
             
-            # Search in FAISS (get more candidates for filtering)
-            search_k = min(k * 3, self.index.ntotal)
-            distances, indices = self.index.search(query_embedding, search_k)
-            
-            # Process results
-            similar_messages = []
-            exclude_conversation_ids = exclude_conversation_ids or []
-            cutoff_date = datetime.now() - timedelta(days=max_age_days) if max_age_days else None
-            
-            for i, (idx, distance) in enumerate(zip(indices[0], distances[0])):
-                if idx == -1:
-                    continue
-                
-                # Get message data
-                message_data = self.message_mapping.get(idx)
-                if not message_data:
-                    continue
-                
-                # Calculate similarity score (convert L2 distance to similarity)
-                similarity_score = max(0.0, 1.0 - (distance / 2.0))  # Normalize L2 distance
-                
-                # Apply filters
-                if similarity_score < min_similarity_score:
-                    continue
-                
-                if message_data['conversation_id'] in exclude_conversation_ids:
-                    continue
-                
-                if cutoff_date and message_data.get('created_at'):
-                    msg_date = datetime.fromisoformat(message_data['created_at'])
-                    if msg_date < cutoff_date:
-                        continue
-                
-                # Add to results
-                result_message = message_data.copy()
-                result_message['similarity_score'] = similarity_score
-                result_message['search_rank'] = len(similar_messages) + 1
-                result_message['l2_distance'] = float(distance)
+            # Serve repeated or near-identical queries from the semantic cache
+            cache_params = f"{k}|{sorted(exclude_conversation_ids or [])}|{min_similarity_score}|{max_age_days}"
+            cached_results = self.search_cache.get(query_embedding, cache_params)
+            if cached_results is not None:
+                logger.log_system_event(
+                    "message_search_cache_hit",
+                    f"Served {len(cached_results)} cached messages for query '{query[:50]}...'"
+                )
+                return cached_results
+            
+            with self._index_lock:
+                # Search in FAISS (get more candidates for filtering); excluded
+                # conversations are filtered inside the index rather than afterwards
+                search_k = min(k * 3, self.index.ntotal)
+                excluded_ids = self._positions_for_conversations(exclude_conversation_ids or [])
+                params, _keepalive = self._search_params(self.index, search_k, excluded_ids)
+                if params is not None:
+                    scores, indices = self.index.search(query_embedding, search_k, params=params)
+                else:
+                    scores, indices = self.index.search(query_embedding, search_k)
                 
-                similar_messages.append(result_message)
+                similar_messages = self._select_results(indices[0], scores[0], k, min_similarity_score, max_age_days)
                 
-                # Stop if we have enough results
-                if len(similar_messages) >= k:
-                    break
+                # Cache under the same lock so an update cannot clear the cache in between
+                self.search_cache.put(query_embedding, similar_messages, cache_params)
             
             search_time = time.time() - start_time
             
@@ -435,6 +786,153 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
             logger.log_error("message_search_failed", str(e), f"Failed to search similar messages for query: {query[:100]}")
             return []
     
+    def search_similar_messages_batch(self,
+                                      queries: List[str],
+                                      k: int = None,
+                                      exclude_conversation_ids: List[int] = None,
+                                      min_similarity_score: float = None,
+                                      max_age_days: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Search for messages similar to each of several queries
+        
+        Queries are encoded in one batch and all cache misses are answered by a
+        single FAISS search call.
+        
+        Args:
+            queries: Search queries
+            k: Number of similar messages to return per query
+            exclude_conversation_ids: Conversation IDs to exclude from results
+            min_similarity_score: Minimum similarity score threshold
+            max_age_days: Maximum age of messages in days (None = no limit)
+            
+        Returns:
+            One list of similar messages per query, in query order
+        """
+        k = k or self.config.message_search_k
+        min_similarity_score = min_similarity_score or self.config.message_min_similarity
+        max_age_days = max_age_days or self.config.message_max_age_days
+        results: List[List[Dict]] = [[] for _ in queries]
+        
+        try:
+            self._schedule_incremental_update()
+            
+            if not queries or not self.index or self.index.ntotal == 0:
+                return results
+            
+            start_time = time.time()
+            query_embeddings = self._encode_texts(list(queries))
+            
+            # Answer what we can from the semantic cache, then search the rest together
+            cache_params = f"{k}|{sorted(exclude_conversation_ids or [])}|{min_similarity_score}|{max_age_days}"
+            misses = []
+            for i in range(len(queries)):
+                cached_results = self.search_cache.get(query_embeddings[i:i + 1], cache_params)
+                if cached_results is not None:
+                    results[i] = cached_results
+                else:
+                    misses.append(i)
+            
+            if misses:
+                with self._index_lock:
+                    search_k = min(k * 3, self.index.ntotal)
+                    excluded_ids = self._positions_for_conversations(exclude_conversation_ids or [])
+                    params, _keepalive = self._search_params(self.index, search_k, excluded_ids)
+                    batch = query_embeddings[misses]
+                    if params is not None:
+                        scores, indices = self.index.search(batch, search_k, params=params)
+                    else:
+                        scores, indices = self.index.search(batch, search_k)
+                    
+                    for row, i in enumerate(misses):
+                        results[i] = self._select_results(indices[row], scores[row], k, min_similarity_score, max_age_days)
+                        self.search_cache.put(query_embeddings[i:i + 1], results[i], cache_params)
+            
+            logger.log_system_event(
+                "message_batch_search_completed",
+                f"Searched {len(queries)} queries ({len(queries) - len(misses)} cached) in {time.time() - start_time:.3f}s"
+            )
+            return results
+            
+        except Exception as e:
+            logger.log_error("message_batch_search_failed", str(e), f"Failed to search similar messages for {len(queries)} queries")
+            return results
+    
+    def _select_results(self,
+                        indices: np.ndarray,
+                        scores: np.ndarray,
+                        k: int,
+                        min_similarity_score: float,
+                        max_age_days: Optional[int]) -> List[Dict]:
+        """
+        Re-rank and filter one query's FAISS candidates and materialize the top k
+        
+        Args:
+            indices: FAISS result positions for one query
+            scores: Cosine similarity scores for one query
+            k: Number of results to return
+            min_similarity_score: Minimum similarity score threshold
+            max_age_days: Maximum age of messages in days (None = no limit)
+            
+        Returns:
+            List of similar messages with similarity scores and ranks
+        """
+        # Order candidates by age/role-weighted score before filtering
+        order = self._rerank_candidates(indices, scores)
+        indices, scores = indices[order], scores[order]
+        
+        # Filter all candidates at once; inner product on normalized vectors is the cosine similarity
+        store = self.message_store
+        valid = (indices >= 0) & (indices < len(store)) & (scores >= min_similarity_score)
+        if max_age_days and valid.any():
+            cutoff_ts = int((datetime.now() - timedelta(days=max_age_days)).timestamp())
+            created_ts = store.created_ts[np.where(valid, indices, 0)]
+            valid &= (created_ts == 0) | (created_ts >= cutoff_ts)
+        selected = np.flatnonzero(valid)[:k]
+        
+        # Materialize only the selected rows
+        similar_messages = []
+        for rank, pos in enumerate(selected, 1):
+            result_message = store.record(int(indices[pos]))
+            result_message['similarity_score'] = float(scores[pos])
+            result_message['search_rank'] = rank
+            similar_messages.append(result_message)
+        return similar_messages
+    
+    def _positions_for_conversations(self, conversation_ids: List[int]) -> np.ndarray:
+        """
+        Get the index positions of all messages in the given conversations
+        
+        Args:
+            conversation_ids: Conversation IDs to look up
+            
+        Returns:
+            int64 array of FAISS IDs (index positions)
+        """
+        return self.message_store.positions_in_conversations(conversation_ids)
+    
+    def _rerank_candidates(self, indices: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """
+        Compute the ranking order of FAISS candidates
+        
+        Args:
+            indices: FAISS result positions for one query
+            scores: Cosine similarity scores for one query
+            
+        Returns:
+            Positions into indices/scores, best candidate first
+        """
+        store = self.message_store
+        valid = (indices >= 0) & (indices < len(store))
+        rows = np.where(valid, indices, 0)
+        
+        role_codes = store.roles[rows].astype(np.int64)
+        created_ts = store.created_ts[rows]
+        ages_days = np.maximum(0.0, (time.time() - created_ts) / 86400).astype(np.float32)
+        ages_days[~valid | (created_ts == 0)] = 0.0
+        
+        weighted = rerank(scores.astype(np.float32, copy=False), ages_days, role_codes, self.config.message_age_weight)
+        return np.argsort(-weighted, kind='stable')
+    
     def get_contextual_messages_for_response(self, user_query: str, current_conversation_id: int, max_context_pairs: int = None) -> List[Dict]:
         """
         Get contextually relevant conversation pairs to enhance response generation
@@ -460,15 +958,16 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
                 max_age_days=7  # Only recent messages for relevance
             )
             
-            # Filter to only user messages and find their assistant responses
+            # Filter to only user messages and find their assistant responses in one query
+            user_messages = [msg for msg in similar_user_messages if msg['role'] == 'user']
+            responses = self._find_assistant_responses([msg['id'] for msg in user_messages])
             context_pairs = []
             
-            for user_msg in similar_user_messages:
-                if user_msg['role'] != 'user' or len(context_pairs) >= max_context_pairs:
-                    continue
+            for user_msg in user_messages:
+                if len(context_pairs) >= max_context_pairs:
+                    break
                 
-                # Find the corresponding assistant response
-                assistant_response = self._find_assistant_response_for_user_message(user_msg['id'])
+                assistant_response = responses.get(user_msg['id'])
                 
                 if assistant_response:
                     conversation_pair = {
@@ -499,34 +998,49 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         Returns:
             Assistant response dictionary or None if not found
         """
+        return self._find_assistant_responses([user_message_id]).get(user_message_id)
+    
+    def _find_assistant_responses(self, user_message_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Find the first assistant response to each of several user messages in one query
+        
+        Args:
+            user_message_ids: IDs of the user messages
+            
+        Returns:
+            Dictionary mapping user message ID to its assistant response
+        """
+        if not user_message_ids:
+            return {}
+        
         try:
+            _ensure_assistant_reply_index()
             query = """
-                SELECT id, content, created_at, metadata, tool_name, tool_id
+                SELECT DISTINCT ON (parent_message_id)
+                       parent_message_id, id, content, created_at, metadata, tool_name, tool_id
                 FROM messages
-                WHERE parent_message_id = %s 
+                WHERE parent_message_id = ANY(%s)
                 AND role = 'assistant'
-                ORDER BY sequence_number ASC
-                LIMIT 1
+                ORDER BY parent_message_id, sequence_number ASC
             """
             
-            result = db_manager.execute_query(query, (user_message_id,))
+            result = db_manager.execute_query(query, (list(user_message_ids),))
             
-            if result:
-                row = result[0]
-                return {
-                    'id': row[0],
-                    'content': row[1],
-                    'created_at': row[2].isoformat() if row[2] else None,
-                    'metadata': row[3] if row[3] else {},  # JSONB is already a Python dict
-                    'tool_name': row[4],  # NEW: Include tool name
-                    'tool_id': row[5]     # NEW: Include tool ID
+            return {
+                row[0]: {
+                    'id': row[1],
+                    'content': row[2],
+                    'created_at': row[3].isoformat() if row[3] else None,
+                    'metadata': row[4] if row[4] else {},  # JSONB is already a Python dict
+                    'tool_name': row[5],
+                    'tool_id': row[6]
                 }
-            
-            return None
+                for row in result
+            }
             
         except Exception as e:
-            logger.log_error("assistant_response_lookup_failed", str(e), f"Failed to find assistant response for message {user_message_id}")
-            return None
+            logger.log_error("assistant_response_lookup_failed", str(e), f"Failed to find assistant responses for messages {user_message_ids}")
+            return {}
     
     def add_message_to_index(self, message_id: int):
         """
@@ -549,7 +1063,7 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         """Get statistics about the message index"""
         try:
             stats = {
-                "total_messages_indexed": len(self.message_mapping),
+                "total_messages_indexed": len(self.message_store),
                 "last_indexed_message_id": self.last_indexed_message_id,
                 "index_dimension": self.index.d if self.index else 0,
                 "embedding_model": self.config.model_name,
@@ -557,14 +1071,13 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
                 "persistence_enabled": self.enable_persistence
             }
             
-            if self.message_mapping:
+            if len(self.message_store):
                 # Message distribution by role
-                roles = [msg['role'] for msg in self.message_mapping.values()]
-                stats['message_roles'] = {role: roles.count(role) for role in set(roles)}
+                counts = np.bincount(self.message_store.roles, minlength=len(ROLE_NAMES))
+                stats['message_roles'] = {ROLE_NAMES[code]: int(count) for code, count in enumerate(counts) if count}
                 
                 # Conversation distribution
-                conv_ids = [msg['conversation_id'] for msg in self.message_mapping.values()]
-                stats['conversations_indexed'] = len(set(conv_ids))
+                stats['conversations_indexed'] = int(np.unique(self.message_store.conv_ids).size)
             
             return stats
             
@@ -576,9 +1089,10 @@ class MessageEmbeddingManager(BaseEmbeddingManager):
         """Force rebuild the entire message index"""
         try:
             logger.log_system_event("message_index_rebuild_start", "Starting manual message index rebuild")
-            self.last_indexed_message_id = 0
-            self.message_mapping = {}
-            self._build_index_from_scratch()
+            with self._index_lock:
+                self.last_indexed_message_id = 0
+                self.message_store = MessageStore()
+                self._build_index_from_scratch()
             
         except Exception as e:
             logger.log_error("message_index_rebuild_failed", str(e), "Failed to rebuild message index")
@@ -1,17 +1,47 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss, time
+from concurrent.futures import ThreadPoolExecutor
 from terminal.animations import Animations
 from logger import logger
 from utils.database import db_manager
-from embeddings.base.faiss_persistence import FaissPersistenceManager
-from embeddings.base.embedding_manager import BaseEmbeddingManager
+from embeddings.base.faiss_persistence import FaissPersistenceManager, tool_content_hash, index_qtype
+from embeddings.base.embedding_manager import BaseEmbeddingManager, SQ_TYPES
+from embeddings.base.tool_scoring import score_candidates
 from embeddings.config import EmbeddingConfig
 
 from dotenv import load_dotenv
 load_dotenv()
 
 
+# Number of set bits in each byte value, for popcounts over packed bitmaps
+POPCOUNT_TABLE = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+
+def top_k_positions(scores, k):
+    """
+    Positions of the k highest scores, best first
+    
+    Partitions first so only the k selected scores are sorted; ties keep their
+    original order.
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        selected = np.argpartition(-scores, k - 1)[:k]
+    else:
+        selected = np.arange(len(scores))
+    return selected[np.lexsort((selected, -scores[selected]))]
+
+
+def semantic_scale(similarity, min_similarity):
+    """
+    Map cosine similarity onto the 0-1 semantic score used by the ranking gates
+    
+    Equals 1 - d / cutoff for the squared L2 distance d = 2 - 2 * cosine on unit
+    vectors, so scores are 0 at the cutoff and 1 for an identical vector.
+    """
+    return np.maximum(0.0, (similarity - min_similarity) / (1.0 - min_similarity))
+
 
 class ToolEmbeddingManager(BaseEmbeddingManager):
     def __init__(self, config: EmbeddingConfig = None):
@@ -20,6 +50,13 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
         self.distance_threshold = self.config.distance_threshold
         self.embedding_model_name = self.config.model_name
         self.enable_persistence = self.config.enable_persistence
+        self._knn_source = None  # Index the NumPy search matrix was taken from
+        self._knn_vectors = None
+        self._gpu_source = None  # Index the GPU copy was made from
+        self._gpu_index = None
+        self._gpu_resources = None
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool-index-save")
+        self._pending_save = None  # Future of the last background save
         
         # Initialize base class
         super().__init__(
@@ -30,44 +67,182 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
         
         # Initialize persistence manager
         if self.enable_persistence:
-            self.persistence_manager = FaissPersistenceManager(self.config.tool_index_dir)
+            self.persistence_manager = FaissPersistenceManager(
+                self.config.tool_index_dir,
+                mmap=self.config.mmap,
+                validation_ttl_seconds=self.config.index_validation_ttl
+            )
         
         def load():
             self._load_with_persistence()
         self.animator.run_with_animation(load, message="Loading Vector Indexes...")
 
 
-    def prepare_embeddings(self):
+    @staticmethod
+    def _embedding_text(tool):
         # Handle query_examples whether it's a string or list
-        descriptions = []
-        for tool in self.tool_dict.values():
-            query_examples = tool["query_examples"]
-            if isinstance(query_examples, list):
-                # Join list items with space for embedding
-                descriptions.append(" ".join(query_examples))
-            else:
-                descriptions.append(query_examples)
+        query_examples = tool["query_examples"]
+        if isinstance(query_examples, list):
+            # Join list items with space for embedding
+            return " ".join(query_examples)
+        return query_examples
+    
+    @staticmethod
+    def _query_example_list(tool):
+        """query_examples as a list of strings, whether stored as a string or a list"""
+        query_examples = tool['query_examples']
+        return query_examples if isinstance(query_examples, list) else [query_examples]
+    
+    def _refresh_tool_stats(self):
+        """
+        Precompute per-tool token statistics as arrays indexed by FAISS position
+        
+        The scoring in query_tools_optimized/query_tools_with_ranking reads these
+        instead of re-splitting every candidate's text on every query. They derive
+        from tool_mapping, so they are recomputed whenever the mapping is replaced.
+        """
+        n = len(self.tool_mapping)
+        self.tool_tokens_count = np.zeros(n, dtype=np.int32)
+        self.desc_tokens_count = np.zeros(n, dtype=np.int32)
+        word_sets = [frozenset()] * n
+        
+        for i, tool in self.tool_mapping.items():
+            examples = self._query_example_list(tool)
+            self.tool_tokens_count[i] = sum(len(example.split()) for example in examples)
+            self.desc_tokens_count[i] = len(tool['description'].split())
+            word_sets[i] = frozenset(word for example in examples for word in example.lower().split())
+        
+        # Keyword membership as one packed bitmap row per tool over the example vocabulary
+        self.tool_vocab = {word: i for i, word in enumerate(sorted(set().union(*word_sets)))}
+        membership = np.zeros((n, len(self.tool_vocab)), dtype=bool)
+        for i, words in enumerate(word_sets):
+            membership[i, [self.tool_vocab[word] for word in words]] = True
+        self.tool_bits = np.packbits(membership, axis=1)
+    
+    def _keyword_overlap(self, query_words, positions):
+        """
+        Count query words present in each tool's examples
+        
+        Args:
+            query_words: Set of lowercased query words
+            positions: Tool positions to score
+            
+        Returns:
+            Overlap count per position (words outside the tool vocabulary never match)
+        """
+        query_bits = np.zeros(len(self.tool_vocab), dtype=bool)
+        query_bits[[self.tool_vocab[word] for word in query_words if word in self.tool_vocab]] = True
+        return POPCOUNT_TABLE[self.tool_bits[positions] & np.packbits(query_bits)].sum(axis=1, dtype=np.int64)
+    
+    def _candidate(self, position, scores):
+        """Build one result dict: the tool's mapping entry merged with its scores"""
+        return {**self.tool_mapping[int(position)], **scores}
+    
+    def _mapping_entry(self, name):
+        """Mapping entry for a tool, with a content hash for incremental change detection"""
+        tool = self.tool_dict[name]
+        return {"name": name, **tool, "content_hash": tool_content_hash(name, tool)}
+
+    def prepare_embeddings(self):
+        descriptions = [self._embedding_text(tool) for tool in self.tool_dict.values()]
         
-        vectors = self.embedding_model.encode(descriptions)  # shape (n, d)
-        vectors = np.array(vectors, dtype='float32')
-        mapping = {i: {"name": name, **self.tool_dict[name]} for i, name in enumerate(self.tool_dict)}
+        vectors = self._encode_texts(descriptions)  # shape (n, d), unit-norm to match query vectors
+        mapping = {i: self._mapping_entry(name) for i, name in enumerate(self.tool_dict)}
         return vectors, mapping
 
     def _build_index(self, vectors, mapping):
         """Build FAISS index from vectors and mapping"""
-        d = vectors.shape[1]
-        index = faiss.IndexFlatL2(d)
-        index.add(vectors)
-        return index
+        return self.create_faiss_index(vectors)
     
     def _search_index(self, query_vector, k):
-        """Search index with query vector"""
-        return self.index.search(query_vector, k)
+        """
+        Search the tool index, as FAISS search() would
+        
+        Tool sets up to tool_numpy_knn_max are scored with a single matmul against
+        the reconstructed vectors, skipping FAISS dispatch and threading overhead.
+        
+        Args:
+            query_vector: (q, d) float32 query vectors
+            k: Neighbours per query
+        
+        Returns:
+            (similarities, indices), each of shape (q, min(k, n)) on the NumPy path
+        """
+        matrix = self._knn_matrix()
+        if matrix is None:
+            return self.index.search(query_vector, k)
+        
+        similarities = query_vector @ matrix.T
+        k = min(k, len(matrix))
+        if k < len(matrix):
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(matrix)), similarities.shape)
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_similarities, axis=1, kind='stable')
+        return (np.take_along_axis(top_similarities, order, axis=1),
+                np.take_along_axis(top, order, axis=1).astype(np.int64))
+    
+    def _knn_matrix(self):
+        """Tool vectors for the NumPy search path, or None when the index is too large"""
+        if self._knn_source is not self.index:
+            self._knn_source = self.index
+            n = self.index.ntotal
+            self._knn_vectors = self.index.reconstruct_n(0, n) if 0 < n <= self.config.tool_numpy_knn_max else None
+        return self._knn_vectors
+    
+    def _batch_search_index(self):
+        """
+        GPU copy of the tool index for batched searches, or None to search on the CPU
+        
+        Only used for batches: a single query does not amortize the host/device copies.
+        Index types without a GPU implementation (e.g. HNSW) stay on the CPU.
+        """
+        if not self.config.tool_use_gpu or not hasattr(faiss, 'StandardGpuResources') or faiss.get_num_gpus() == 0:
+            return None
+        if self._gpu_source is not self.index:
+            self._gpu_source = self.index
+            try:
+                if self._gpu_resources is None:
+                    self._gpu_resources = faiss.StandardGpuResources()
+                self._gpu_index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, self.index)
+            except Exception as e:
+                self._gpu_index = None
+                logger.log_error("tool_gpu_index_failed", str(e), "Batched tool search stays on CPU")
+        return self._gpu_index
     
     def create_faiss_index(self, vectors):
+        """
+        Create an inner-product index over tool vectors
+        
+        Tool and query vectors are unit-norm, so the index reports cosine
+        similarity directly and it is used as the semantic score.
+        Small tool sets stay on an exact flat scan; larger ones use an HNSW graph.
+        With tool_quantization set to fp16/sq8 the vectors are stored through a
+        scalar quantizer (similarities are then approximate).
+        """
         d = vectors.shape[1]
-        index = faiss.IndexFlatL2(d)
+        metric = faiss.METRIC_INNER_PRODUCT
+        qtype = SQ_TYPES.get(self.config.tool_quantization)
+        if len(vectors) >= self.config.tool_hnsw_min_vectors:
+            if qtype is not None:
+                index = faiss.IndexHNSWSQ(d, qtype, self.config.hnsw_m, metric)
+            else:
+                index = faiss.IndexHNSWFlat(d, self.config.hnsw_m, metric)
+            index.hnsw.efConstruction = self.config.tool_hnsw_ef_construction
+        elif qtype is not None:
+            index = faiss.IndexScalarQuantizer(d, qtype, metric)
+        else:
+            index = faiss.IndexFlatIP(d)
+        if not index.is_trained:
+            index.train(vectors)
         index.add(vectors)
+        return self._configure_tool_index(index)
+    
+    def _configure_tool_index(self, index):
+        """Apply search-time HNSW parameters to a new or loaded tool index"""
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = max(self.config.tool_hnsw_ef_search, self.config.tool_search_k)
         return index
     
     def query_tools_optimized(self, user_query, max_candidates=None, min_semantic_score=None):
@@ -93,82 +268,110 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
         
         # Search more candidates initially for better ranking
         search_k = min(self.config.tool_search_k, len(self.tool_mapping) * 2)
-        distances, indices = self.index.search(query_vector, search_k)
+        similarities, indices = self._search_index(query_vector, search_k)
         
-        # Phase 2: Multi-factor scoring and filtering
-        candidates = []
-        conservative_threshold = 0.8  # Much stricter than original 1.5
+        filtered_candidates = self._rank_hits(
+            user_query, query_vector, indices[0], similarities[0], max_candidates, min_semantic_score
+        )
         
-        for i, dist in zip(indices[0], distances[0]):
-            if i == -1 or dist > conservative_threshold:
-                continue
-                
-            tool_data = self.tool_mapping[i].copy()
-            
-            # Semantic similarity (primary factor)
-            semantic_score = max(0.0, 1.0 - (dist / conservative_threshold))
-            
-            # Skip low-scoring candidates early
-            if semantic_score < min_semantic_score:
-                continue
-                
-            # Query-tool length matching
-            query_tokens = len(user_query.split())
-            # Handle query_examples whether it's a string or list
-            query_examples = tool_data['query_examples']
-            if isinstance(query_examples, list):
-                tool_tokens = sum(len(example.split()) for example in query_examples)
-            else:
-                tool_tokens = len(query_examples.split())
-            description_tokens = len(tool_data['description'].split())
-            
-            # Length similarity factor (optimal range: 0.3-3.0 ratio)
-            length_ratio = query_tokens / max(1, tool_tokens)
-            length_score = 1.0 - abs(1.0 - min(3.0, max(0.33, length_ratio))) / 2.0
-            
-            # Description relevance (longer descriptions may be more specific)
-            description_factor = min(1.0, description_tokens / max(1, query_tokens))
-            
-            # Keyword overlap bonus
-            query_words = set(user_query.lower().split())
-            # Handle query_examples whether it's a string or list for keyword matching
-            query_examples = tool_data['query_examples']
-            if isinstance(query_examples, list):
-                tool_words = set()
-                for example in query_examples:
-                    tool_words.update(example.lower().split())
-            else:
-                tool_words = set(query_examples.lower().split())
-            overlap_ratio = len(query_words & tool_words) / max(1, len(query_words))
-            keyword_bonus = overlap_ratio * 0.2
-            
-            # Combined scoring with weights
-            combined_score = (
-                0.50 * semantic_score +           # Primary: semantic similarity
-                0.25 * length_score +             # Secondary: length matching  
-                0.15 * description_factor +       # Tertiary: description depth
-                0.10 * keyword_bonus              # Bonus: direct keyword matches
-            )
-            
-            tool_data.update({
-                'semantic_score': semantic_score,
-                'length_score': length_score,
-                'description_factor': description_factor,
-                'keyword_bonus': keyword_bonus,
-                'combined_score': combined_score,
-                'distance': float(dist)
-            })
-            
-            candidates.append(tool_data)
+        search_time = time.time() - start_time
+        
+        # Enhanced logging with filtering statistics
+        logger.log_faiss_search(
+            user_query, 
+            filtered_candidates, 
+            search_time
+        )
+        
+        return filtered_candidates
+    
+    def query_tools_batch(self, queries, max_candidates=None, min_semantic_score=None):
+        """
+        Rank tools for several queries with one encode call and one FAISS search
+        
+        Args:
+            queries: User queries
+            max_candidates: Maximum tools to return per query
+            min_semantic_score: Minimum score threshold before LLM evaluation
+        
+        Returns:
+            One candidate list per query, as query_tools_optimized would return
+        """
+        max_candidates = max_candidates or self.config.tool_max_candidates
+        min_semantic_score = min_semantic_score or self.config.tool_min_semantic_score
+        if not queries:
+            return []
+        
+        start_time = time.time()
+        query_vectors = self._encode_texts(list(queries))
+        search_k = min(self.config.tool_search_k, len(self.tool_mapping) * 2)
+        gpu_index = self._batch_search_index()
+        if gpu_index is not None:
+            similarities, indices = gpu_index.search(query_vectors, search_k)
+        else:
+            similarities, indices = self._search_index(query_vectors, search_k)
+        
+        results = [
+            self._rank_hits(query, query_vectors[row:row + 1], indices[row], similarities[row],
+                            max_candidates, min_semantic_score)
+            for row, query in enumerate(queries)
+        ]
+        
+        logger.log_system_event(
+            "tool_batch_search_completed",
+            f"Ranked tools for {len(queries)} queries in {time.time() - start_time:.3f}s"
+        )
+        return results
+    
+    def _rank_hits(self, user_query, query_vector, indices, similarities, max_candidates, min_semantic_score):
+        """
+        Score, rank and gate one query's FAISS hits
+        
+        Args:
+            user_query: The query text (for token and keyword factors)
+            query_vector: The query's (1, d) vector, reused by the fallback search
+            indices: FAISS result positions for the query
+            similarities: Cosine similarities for the query
+            max_candidates: Maximum tools to return
+            min_semantic_score: Minimum semantic score
+        
+        Returns:
+            List of top-ranked tools, or the fallback search results if none qualify
+        """
+        # Phase 2: Multi-factor scoring and filtering, vectorized over all hits
+        conservative_similarity = 0.6  # Squared L2 of 0.8 on unit vectors; much stricter than original 1.5
+        
+        # Semantic similarity (primary factor); skip low-scoring candidates early
+        semantic_score = semantic_scale(similarities, conservative_similarity)
+        keep = (indices != -1) & (similarities >= conservative_similarity) & (semantic_score >= min_semantic_score)
+        idx, cosine, semantic_score = indices[keep], similarities[keep], semantic_score[keep]
         
         # Phase 3: Ranking and selection
-        if not candidates:
+        if not len(idx):
             # Fallback: try with relaxed threshold
-            return self._fallback_search(user_query, min_semantic_score * 0.5, max_candidates)
+            return self._fallback_search(user_query, min_semantic_score * 0.5, max_candidates, query_vector)
+        
+        # Length match (optimal ratio 0.3-3.0), description depth and keyword overlap,
+        # weighted 0.50 semantic / 0.25 length / 0.15 description / 0.10 keyword
+        query_split = user_query.lower().split()  # Split once; token count and word set both derive from it
+        query_words = set(query_split)
+        length_score, description_factor, keyword_bonus, combined_score = score_candidates(
+            semantic_score, self.tool_tokens_count[idx], self.desc_tokens_count[idx],
+            self._keyword_overlap(query_words, idx), len(query_split), len(query_words)
+        )
         
-        # Sort by combined score and apply top_k limit
-        candidates.sort(key=lambda x: x['combined_score'], reverse=True)
-        final_candidates = candidates[:max_candidates]
+        # Sort by combined score, apply top_k limit and build dicts only for the survivors
+        final_candidates = []
+        for j in top_k_positions(combined_score, max_candidates):
+            final_candidates.append(self._candidate(idx[j], {
+                'semantic_score': float(semantic_score[j]),
+                'length_score': float(length_score[j]),
+                'description_factor': float(description_factor[j]),
+                'keyword_bonus': float(keyword_bonus[j]),
+                'combined_score': float(combined_score[j]),
+                'cosine_similarity': float(cosine[j]),
+                'distance': float(2.0 - 2.0 * cosine[j])
+            }))
         
         # Phase 4: Quality gates
         filtered_candidates = []
@@ -185,56 +388,39 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
             if candidate['semantic_score'] >= min_semantic_score:
                 filtered_candidates.append(candidate)
         
-        search_time = time.time() - start_time
-        
-        # Enhanced logging with filtering statistics
-        logger.log_faiss_search(
-            user_query, 
-            filtered_candidates, 
-            search_time
-        )
-        
         return filtered_candidates
     
     def query_tools_with_ranking(self, user_query, k=5, semantic_weight=0.6):
         """Enhanced tool querying with multiple ranking factors"""
-        query_vector = self.embedding_model.encode([user_query]).astype('float32')
-        distances, indices = self.index.search(query_vector, k * 2)  # Get more candidates
+        query_vector = self._encode_query(user_query)
+        similarities, indices = self._search_index(query_vector, k * 2)  # Get more candidates
 
+        # Squared L2 cutoff on unit vectors, as a cosine similarity; slightly more permissive
+        min_similarity = 1.0 - self.distance_threshold * 1.2 / 2.0
+        idx, cosine = indices[0], similarities[0]
+        keep = (idx != -1) & (cosine >= min_similarity)
+        idx, cosine = idx[keep], cosine[keep]
+        semantic_score = semantic_scale(cosine, min_similarity)
+        
+        # Query length matching factor (longer descriptions might be more detailed)
+        query_len = len(user_query.split())
+        desc_len = self.tool_tokens_count[idx]
+        length_factor = np.where(desc_len > 0, np.minimum(1.0, query_len / np.maximum(1, desc_len)), 0.5)
+        
+        # Combined score
+        combined_score = semantic_weight * semantic_score + (1 - semantic_weight) * length_factor
+        
+        # Sort by combined score and build dicts only for the top k
         candidates = []
-        for i, dist in zip(indices[0], distances[0]):
-            if i != -1 and dist <= self.distance_threshold * 1.2:  # Slightly more permissive
-                tool_data = self.tool_mapping[i].copy()
-                
-                # Semantic similarity score (0-1, higher is better)
-                semantic_score = max(0.0, 1.0 - (dist / (self.distance_threshold * 1.2)))
-                
-                # Query length matching factor (longer descriptions might be more detailed)
-                query_len = len(user_query.split())
-                # Handle query_examples whether it's a string or list
-                query_examples = tool_data['query_examples']
-                if isinstance(query_examples, list):
-                    desc_len = sum(len(example.split()) for example in query_examples)
-                else:
-                    desc_len = len(query_examples.split())
-                length_factor = min(1.0, query_len / max(1, desc_len)) if desc_len > 0 else 0.5
-                
-                # Combined score
-                combined_score = (semantic_weight * semantic_score + 
-                                (1 - semantic_weight) * length_factor)
-                
-                tool_data.update({
-                    'semantic_score': semantic_score,
-                    'length_factor': length_factor,
-                    'combined_score': combined_score,
-                    'distance': float(dist)
-                })
-                
-                candidates.append(tool_data)
-
-        # Sort by combined score and return top k
-        candidates.sort(key=lambda x: x['combined_score'], reverse=True)
-        return candidates[:k]
+        for j in top_k_positions(combined_score, k):
+            candidates.append(self._candidate(idx[j], {
+                'semantic_score': float(semantic_score[j]),
+                'length_factor': float(length_factor[j]),
+                'combined_score': float(combined_score[j]),
+                'cosine_similarity': float(cosine[j]),
+                'distance': float(2.0 - 2.0 * cosine[j])
+            }))
+        return candidates
 
     def load_db_tools(self):
         """Load tools from database using centralized database manager"""
@@ -259,27 +445,29 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
             # Return empty dict as fallback
             return {}
     
-    def _fallback_search(self, user_query, relaxed_threshold, max_candidates):
+    def _fallback_search(self, user_query, relaxed_threshold, max_candidates, query_vector=None):
         """Fallback search with very relaxed thresholds when no good matches found"""
-        query_vector = self.embedding_model.encode([user_query]).astype('float32')
-        distances, indices = self.index.search(query_vector, max_candidates * 2)
+        if query_vector is None:
+            query_vector = self._encode_query(user_query)
+        similarities, indices = self._search_index(query_vector, max_candidates * 2)
         
+        fallback_similarity = 0.4  # Squared L2 of 1.2; still stricter than original 1.5
         fallback_candidates = []
-        for i, dist in zip(indices[0], distances[0]):
-            if i != -1 and dist <= 1.2:  # Still stricter than original 1.5
-                tool_data = self.tool_mapping[i].copy()
-                semantic_score = max(0.0, 1.0 - (dist / 1.2))
-                
+        for i, cosine in zip(indices[0], similarities[0]):
+            if i != -1 and cosine >= fallback_similarity:
+                semantic_score = float(semantic_scale(cosine, fallback_similarity))
                 if semantic_score >= relaxed_threshold:
-                    tool_data.update({
+                    fallback_candidates.append(self._candidate(i, {
                         'semantic_score': semantic_score,
                         'combined_score': semantic_score,
-                        'distance': float(dist),
+                        'cosine_similarity': float(cosine),
+                        'distance': float(2.0 - 2.0 * cosine),
                         'llm_priority': 'fallback'
-                    })
-                    fallback_candidates.append(tool_data)
+                    }))
+                    if len(fallback_candidates) >= max_candidates:
+                        break
         
-        return fallback_candidates[:max_candidates]
+        return fallback_candidates
     
     def should_skip_llm_evaluation(self, tool_candidate, user_query):
         """
@@ -306,7 +494,6 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
         """
         # Load tools from database
         self.tool_dict = self.load_db_tools()
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
         
         if not self.enable_persistence or not self.tool_dict:
             # Fallback to direct rebuild
@@ -320,13 +507,22 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
             self.embedding_model_name
         )
         
+        # An index persisted under a different tool_quantization or an L2 metric is rebuilt
+        if is_valid and loaded_index is not None and (
+            index_qtype(loaded_index) != SQ_TYPES.get(self.config.tool_quantization)
+            or loaded_index.metric_type != faiss.METRIC_INNER_PRODUCT
+        ):
+            is_valid = False
+        
         if is_valid and loaded_index and loaded_mapping:
             # Use persisted index
-            self.index = loaded_index
-            self.tool_mapping = loaded_mapping
+            self.index = self._configure_tool_index(loaded_index)
             
-            # Convert string keys back to integers for tool_mapping
-            self.tool_mapping = {int(k): v for k, v in loaded_mapping.items()}
+            # The columnar mapping is read with int keys; only legacy JSON mappings need converting
+            if isinstance(next(iter(loaded_mapping)), str):
+                loaded_mapping = {int(k): v for k, v in loaded_mapping.items()}
+            self.tool_mapping = loaded_mapping
+            self._refresh_tool_stats()
             
             logger.log_system_event(
                 "tool_embeddings_loaded_from_disk", 
@@ -339,14 +535,73 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
                 "tool_embeddings_rebuild_required", 
                 "Rebuilding index due to validation failure or missing files"
             )
-            self._build_index_from_scratch()
-            self._save_index_to_disk()
+            if not self._rebuild_changed_tools():
+                self._build_index_from_scratch()
+            # The index is usable now; write it out while the first queries run
+            self._pending_save = self._save_executor.submit(self._save_index_to_disk)
+    
+    def wait_for_pending_save(self):
+        """Block until a background index save (if any) has finished"""
+        if self._pending_save is not None:
+            try:
+                self._pending_save.result()
+            except Exception as e:
+                logger.log_error("tool_embeddings_persistence_failed", str(e), "Background index save failed")
+            self._pending_save = None
+    
+    def _rebuild_changed_tools(self):
+        """
+        Rebuild the index re-embedding only tools that changed since the persisted index
+        
+        Vectors of unchanged tools are reconstructed from the old index.
+        
+        Returns:
+            True if the index was rebuilt this way, False if a full rebuild is needed
+        """
+        old_index, old_mapping = self.persistence_manager.load_unvalidated(self.embedding_model_name)
+        if old_index is None or not old_mapping:
+            return False
+        
+        # Quantized vectors reconstruct lossily; re-embed everything rather than compound the error
+        if index_qtype(old_index) is not None:
+            return False
+        
+        try:
+            added, removed, modified = self.persistence_manager.diff_tools(self.tool_dict, old_mapping)
+            old_positions = {entry['name']: pos for pos, entry in old_mapping.items() if entry['name'] not in modified}
+            
+            names = list(self.tool_dict)
+            changed = [i for i, name in enumerate(names) if name not in old_positions]
+            
+            vectors = np.empty((len(names), old_index.d), dtype='float32')
+            for i, name in enumerate(names):
+                if name in old_positions:
+                    vectors[i] = old_index.reconstruct(old_positions[name])
+            if changed:
+                vectors[changed] = self._encode_texts([self._embedding_text(self.tool_dict[names[i]]) for i in changed])
+            
+            self.tool_vectors = vectors
+            self.tool_mapping = {i: self._mapping_entry(name) for i, name in enumerate(names)}
+            self._refresh_tool_stats()
+            self.index = self.create_faiss_index(vectors)
+            
+            logger.log_system_event(
+                "tool_embeddings_patched",
+                f"Re-embedded {len(changed)} of {len(names)} tools "
+                f"({len(added)} added, {len(modified)} modified, {len(removed)} removed)"
+            )
+            return True
+            
+        except Exception as e:
+            logger.log_error("tool_embeddings_patch_failed", str(e), "Falling back to full tool index rebuild")
+            return False
     
     def _build_index_from_scratch(self):
         """
         Build FAISS index from scratch by generating embeddings
         """
         self.tool_vectors, self.tool_mapping = self.prepare_embeddings()
+        self._refresh_tool_stats()
         self.index = self.create_faiss_index(self.tool_vectors)
         
     def _save_index_to_disk(self):
@@ -382,6 +637,9 @@ class ToolEmbeddingManager(BaseEmbeddingManager):
         """
         logger.log_system_event("tool_embeddings_manual_rebuild", "Manually rebuilding tool embeddings index")
         
+        # Don't swap the index out from under a save that is still writing it
+        self.wait_for_pending_save()
+        
         # Reload tools from database
         self.tool_dict = self.load_db_tools()
         
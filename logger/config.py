@@ -15,6 +15,10 @@ class LoggerConfig:
     DEFAULT_LOG_LEVEL = "INFO"
     CONSOLE_LOG_LEVEL = "ERROR"
     
+    # File buffering: records are written once this many are buffered, or immediately at FLUSH_LEVEL
+    BUFFER_CAPACITY = 256
+    FLUSH_LEVEL = "ERROR"
+    
     # Log formatters
     DEFAULT_FORMATTER = "%(asctime)s | %(levelname)s | %(message)s"
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
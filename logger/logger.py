@@ -1,8 +1,34 @@
 import logging
+import logging.handlers
 import json
 import time
 from typing import Dict, Any, List, Optional
 from .config import LoggerConfig
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a log payload to JSON, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, default=str)
+
+
+class _LazyJson:
+    """Log argument serialized to JSON only when a handler formats the record"""
+    
+    __slots__ = ("obj",)
+    
+    def __init__(self, obj: Any):
+        self.obj = obj
+    
+    def __str__(self) -> str:
+        return _dumps(self.obj)
+
 
 class Logger:
     """Comprehensive logger for tracking the entire AI conversation flow with separate log files"""
@@ -24,16 +50,19 @@ class Logger:
         self.exceptions_logger = logging.getLogger(LoggerConfig.EXCEPTIONS_LOGGER_NAME)
         self.exceptions_logger.setLevel(getattr(logging, LoggerConfig.DEFAULT_LOG_LEVEL))
         
+        # File handlers open their files on first write (delay=True), so importing the
+        # logger costs no file I/O; with buffering below that is the first flush
+        
         # Create file handler for prompts
-        prompts_handler = logging.FileHandler(prompts_log_file)
+        prompts_handler = logging.FileHandler(prompts_log_file, delay=True)
         prompts_handler.setLevel(getattr(logging, LoggerConfig.DEFAULT_LOG_LEVEL))
         
         # Create file handler for system events
-        system_handler = logging.FileHandler(system_log_file)
+        system_handler = logging.FileHandler(system_log_file, delay=True)
         system_handler.setLevel(getattr(logging, LoggerConfig.DEFAULT_LOG_LEVEL))
         
         # Create file handler for exceptions
-        exceptions_handler = logging.FileHandler(exceptions_log_file)
+        exceptions_handler = logging.FileHandler(exceptions_log_file, delay=True)
         exceptions_handler.setLevel(getattr(logging, LoggerConfig.DEFAULT_LOG_LEVEL))
         
         # Create console handler for important events (errors only)
@@ -51,17 +80,32 @@ class Logger:
         exceptions_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        self.prompt_logger.addHandler(prompts_handler)
-        self.system_logger.addHandler(system_handler)
-        self.exceptions_logger.addHandler(exceptions_handler)
+        # Buffer file writes; buffers are flushed when full, on errors and at interpreter exit
+        self._buffered_handlers = []
+        for target_logger, file_handler in ((self.prompt_logger, prompts_handler),
+                                            (self.system_logger, system_handler),
+                                            (self.exceptions_logger, exceptions_handler)):
+            buffered = logging.handlers.MemoryHandler(
+                LoggerConfig.BUFFER_CAPACITY,
+                flushLevel=getattr(logging, LoggerConfig.FLUSH_LEVEL),
+                target=file_handler
+            )
+            buffered.setLevel(file_handler.level)
+            target_logger.addHandler(buffered)
+            self._buffered_handlers.append(buffered)
         self.exceptions_logger.addHandler(console_handler)
         
         self.session_start = time.time()
         self.system_logger.info(LoggerConfig.SESSION_START_MARKER)
     
+    def flush(self):
+        """Write all buffered records to the log files"""
+        for handler in self._buffered_handlers:
+            handler.flush()
+    
     def log_user_input(self, user_query: str):
         """Log user input to prompts log"""
-        self.prompt_logger.info(f"USER_INPUT | {user_query}")
+        self.prompt_logger.info("USER_INPUT | %s", user_query)
     
     def log_model_prompt(self, prompt_type: str, prompt: str, context: Optional[str] = None):
         """Log exact prompts sent to model to prompts log"""
@@ -80,6 +124,8 @@ class Logger:
     
     def log_faiss_search(self, query: str, results: List[Dict], search_time: float):
         """Log FAISS semantic search results to system log"""
+        if not self.system_logger.isEnabledFor(logging.INFO):
+            return
         result_summary = []
         try:
             for tool in results:
@@ -89,26 +135,30 @@ class Logger:
                     "semantic_score": float(tool.get("semantic_score", 0))
                 })
             
+            # The summary is built here, so it is safe to serialize when the buffer flushes
             self.system_logger.info(
-                f"FAISS_SEARCH | Query: '{query}' | "
-                f"Results: {json.dumps(result_summary)} | "
-                f"Search_Time: {search_time:.3f}s"
+                "FAISS_SEARCH | Query: '%s' | Results: %s | Search_Time: %.3fs",
+                query, _LazyJson(result_summary), search_time
             )
         except Exception as e:
             self.log_exception("FAISS_SEARCH_LOG_ERROR", str(e), f"Query: '{query}'")
     
     def log_tool_evaluation(self, user_query: str, tool_name: str, decision: bool, confidence: float, reasoning: str, evaluation_time: float):
         """Log tool evaluation decisions with confidence to system log"""
+        if not self.system_logger.isEnabledFor(logging.INFO):
+            return
         self.system_logger.info(
-            f"TOOL_EVALUATION | Query: '{user_query}' | "
-            f"Tool: {tool_name} | Decision: {decision} | "
-            f"Confidence: {confidence:.2f} | Reasoning: '{reasoning}' | "
-            f"Eval_Time: {evaluation_time:.3f}s"
+            "TOOL_EVALUATION | Query: '%s' | Tool: %s | Decision: %s | "
+            "Confidence: %.2f | Reasoning: '%s' | Eval_Time: %.3fs",
+            user_query, tool_name, decision, confidence, reasoning, evaluation_time
         )
     
     def log_tool_execution(self, tool_name: str, tool_result: Dict[str, Any], additional_metadata: Dict = None):
         """Log tool execution results with optional enhanced metadata to system log"""
-        log_message = f"TOOL_EXECUTION | Tool: {tool_name} | Result: {json.dumps(tool_result)}"
+        if not self.system_logger.isEnabledFor(logging.INFO):
+            return
+        # Serialized now rather than lazily: callers may keep mutating tool_result
+        log_message = f"TOOL_EXECUTION | Tool: {tool_name} | Result: {_dumps(tool_result)}"
         
         if additional_metadata:
             metadata_str = " | ".join([f"{k}: {v}" for k, v in additional_metadata.items() if v is not None])
@@ -120,31 +170,30 @@ class Logger:
     def log_context_management(self, action: str, details: str, total_tokens: int):
         """Log context window management events to system log"""
         self.system_logger.info(
-            f"CONTEXT_MGMT | Action: {action} | Details: {details} | "
-            f"Total_Tokens: {total_tokens}"
+            "CONTEXT_MGMT | Action: %s | Details: %s | Total_Tokens: %s",
+            action, details, total_tokens
         )
     
     def log_health_check(self, status: bool, details: str = ""):
         """Log model health check results to system log"""
         status_str = "HEALTHY" if status else "UNHEALTHY"
         if status:
-            self.system_logger.info(f"HEALTH_CHECK | Status: {status_str} | Details: {details}")
+            self.system_logger.info("HEALTH_CHECK | Status: %s | Details: %s", status_str, details)
         else:
-            self.system_logger.warning(f"HEALTH_CHECK | Status: {status_str} | Details: {details}")
+            self.system_logger.warning("HEALTH_CHECK | Status: %s | Details: %s", status_str, details)
     
     def log_retry_attempt(self, attempt: int, max_attempts: int, error: str):
         """Log retry attempts to system log"""
         self.system_logger.warning(
-            f"RETRY_ATTEMPT | Attempt: {attempt}/{max_attempts} | Error: {error}"
+            "RETRY_ATTEMPT | Attempt: %s/%s | Error: %s", attempt, max_attempts, error
         )
     
     def log_conversation_metrics(self, total_exchanges: int, avg_response_time: float, total_tokens: int):
         """Log conversation performance metrics to system log"""
         session_duration = time.time() - self.session_start
         self.system_logger.info(
-            f"SESSION_METRICS | Duration: {session_duration:.1f}s | "
-            f"Exchanges: {total_exchanges} | Avg_Response: {avg_response_time:.2f}s | "
-            f"Total_Tokens: {total_tokens}"
+            "SESSION_METRICS | Duration: %.1fs | Exchanges: %s | Avg_Response: %.2fs | Total_Tokens: %s",
+            session_duration, total_exchanges, avg_response_time, total_tokens
         )
     
     def log_error(self, error_type: str, error_message: str, context: str = ""):
@@ -163,7 +212,7 @@ class Logger:
     
     def log_system_event(self, event_type: str, details: str):
         """Log system events to system log"""
-        self.system_logger.info(f"SYSTEM_EVENT | Type: {event_type} | Details: {details}")
+        self.system_logger.info("SYSTEM_EVENT | Type: %s | Details: %s", event_type, details)
 
 # Global logger instance
 logger = Logger()
\ No newline at end of file
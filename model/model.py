@@ -1,5 +1,7 @@
-from llama_cpp import Llama
-import os, json, time
+from llama_cpp import Llama, LlamaGrammar
+from llama_cpp.llama_cache import LlamaRAMCache
+import os, sys, json, time, threading
+from functools import lru_cache
 from terminal.animations import Animations
 from logger import logger
 try:
@@ -9,8 +11,112 @@ except ImportError:
     TIKTOKEN_AVAILABLE = False
 
 
+# Streamed tokens are written to the terminal in batches: after this many tokens,
+# on a newline, or once this many seconds have passed since the last write
+STREAM_FLUSH_TOKENS = 8
+STREAM_FLUSH_INTERVAL = 0.05
+
+
+# System headers for _build_contextual_prompt; kept byte-identical across turns
+EMBED_CONTEXT_SYSTEM_PROMPT = (
+    "<|system|>\nYou are an assistant that answers user queries using available information. "
+    "Use the information provided to respond naturally and directly. Do not mention the source of the information, "
+    "do not refer to past conversations, and do not add disclaimers. Only provide clear, concise, natural answers.\n"
+)
+TOOL_CONTEXT_SYSTEM_PROMPT = (
+    "<|system|>\nYou are an assistant that answers user queries using available internal data. "
+    "Use the provided information to respond naturally and directly. Do not mention how you got the information, "
+    "do not mention any tools, and do not add disclaimers. Only provide a natural, concise answer.\n"
+)
+
+
+TOOL_EVALUATION_SYSTEM_PROMPT = "You are an expert in tool relevance evaluation."
+
+# Token budget for the conversation text sent to summarization; older messages are dropped first
+SUMMARY_MAX_INPUT_TOKENS = 1800
+
+# Longest reasoning the tool evaluation grammar admits, in characters
+TOOL_REASONING_MAX_CHARS = 120
+
+# GBNF rules shared by every tool evaluation grammar (see _tool_evaluation_grammar).
+# Strings are printable ASCII without quotes or backslashes, so every generated
+# token adds at least one character and the output length bounds the token count.
+TOOL_EVALUATION_GRAMMAR_RULES = rf'''
+decision ::= "\"true\"" | "\"false\""
+confidence ::= "0" ("." [0-9] [0-9]?)? | "1" (".0")?
+string ::= "\"" [ !#-\[\]-~]{{0,{TOOL_REASONING_MAX_CHARS}}} "\""
+ws ::= [ \n]?
+'''
+
+
+def _gbnf_literal(text):
+    """Quote text as a GBNF string literal"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _tool_evaluation_fields(name):
+    """Fixed text that opens one tool's evaluation object, up to the decision value"""
+    return '{"name": ' + json.dumps(name) + ', "decision": '
+
+
+def _tool_evaluation_max_chars(tool_names):
+    """
+    Length of the longest output _tool_evaluation_grammar accepts for these tools
+    
+    Used as the generation token limit: a grammar-conforming answer can never be
+    cut off before its closing bracket.
+    """
+    per_tool = (len('"false"') + len(', "confidence": ') + len("0.00")
+                + len(', "reasoning": ') + TOOL_REASONING_MAX_CHARS + len('""') + len("}"))
+    items = sum(len(_tool_evaluation_fields(name)) + per_tool for name in tool_names)
+    separators = len(", ") * max(0, len(tool_names) - 1)
+    return len("[ ") + items + separators + len(" ]")
+
+
+def _tool_evaluation_grammar(tool_names):
+    """
+    Grammar for a JSON array with exactly one evaluation object per tool, in order
+    
+    The tool names are fixed literals, so the output always parses and maps back
+    to the candidates without a name lookup failing.
+    """
+    items = []
+    for name in tool_names:
+        name_field = _gbnf_literal(_tool_evaluation_fields(name))
+        items.append(
+            f'{name_field} decision ", \\"confidence\\": " confidence '
+            f'", \\"reasoning\\": " string "}}"'
+        )
+    root = 'root ::= "[" ws ' + ' "," ws '.join(items) + ' ws "]"'
+    return LlamaGrammar.from_string(root + "\n" + TOOL_EVALUATION_GRAMMAR_RULES, verbose=False)
+
+
+def _available_cpus():
+    """CPUs this process may run on (respects affinity masks and container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 8
+
+
+@lru_cache(maxsize=1)
+def _get_cl100k():
+    """Load the cl100k_base encoding once per process (building its BPE tables is slow)"""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=4096)
+def _count_cl100k_tokens(text):
+    """
+    Token count of text under cl100k_base, memoized by content
+    
+    Keyed on the string itself: str caches its own hash, so a hit costs one
+    lookup and equal strings can never collide the way a bare hash key could.
+    """
+    return len(_get_cl100k().encode(text))
+
+
 class Phi3Model:
-    def __init__(self, model_path=None, max_context_tokens=3500):
+    def __init__(self, model_path=None, max_context_tokens=3500, n_threads=None, n_ctx=None, prompt_cache_bytes=0):
         self.llm = None
         self.is_loaded = False
         self.is_healthy = True
@@ -18,8 +124,18 @@ class Phi3Model:
         self.health_check_interval = 1800  # 30 minutes
         self.consecutive_failures = 0
         self.max_failures = 3
+        self._llm_lock = threading.Lock()  # llama.cpp contexts are not safe for concurrent calls
+        self._health_thread = None
         self.animator = Animations()
         self.max_context_tokens = max_context_tokens
+        self.n_threads = n_threads or _available_cpus()
+        # KV cache size: the prompt budget plus room for a default-length (512 token) reply
+        self.n_ctx = n_ctx or max_context_tokens + 512
+        # llama.cpp already reuses the longest common prefix with the previous prompt in
+        # its live context. A RAM cache also keeps KV states of earlier prompts, so a chat
+        # turn after a tool evaluation still finds its shared system prefix. States cost
+        # ~400KB per token for Phi-3-mini, hence opt-in (0 = disabled).
+        self.prompt_cache_bytes = prompt_cache_bytes
         
         # Make model path configurable
         self.model_path = model_path or os.path.join(
@@ -30,7 +146,7 @@ class Phi3Model:
         # Initialize tokenizer for token counting
         if TIKTOKEN_AVAILABLE:
             try:
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")  # GPT-4 tokenizer, close approximation
+                self.tokenizer = _get_cl100k()  # GPT-4 tokenizer, close approximation
             except:
                 self.tokenizer = None
         else:
@@ -45,13 +161,55 @@ class Phi3Model:
         def load():
             self.llm = Llama(
                 model_path=self.model_path,
-                n_ctx=4096,
-                n_threads=8,
+                n_ctx=self.n_ctx,
+                n_threads=self.n_threads,
+                n_threads_batch=self.n_threads,
+                # Larger prefill batches amortize matmul launches over more prompt tokens,
+                # at the cost of larger compute buffers (RAM, or VRAM when offloading)
+                n_batch=2048,
+                n_ubatch=512,
                 verbose=False
             )
+            if self.prompt_cache_bytes:
+                self.llm.set_cache(LlamaRAMCache(capacity_bytes=self.prompt_cache_bytes))
             self.is_loaded = True
 
         self.animator.run_with_animation(load, message="Loading Phi3 Model...")
+        self._start_health_monitor()
+    
+    def warmup(self):
+        """
+        Run a one-token generation so the first user request doesn't pay llama.cpp's cold start
+        
+        The first evaluation allocates compute buffers and faults in the model weights.
+        """
+        if not self.is_loaded:
+            return
+        start_time = time.time()
+        try:
+            with self._llm_lock:
+                self.llm(" ", max_tokens=1)
+            logger.log_system_event("model_warmup", f"Warm-up inference took {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.log_error("model_warmup_failed", str(e), "First request will pay the cold start")
+    
+    def _start_health_monitor(self):
+        """
+        Run health_check every health_check_interval on a daemon thread
+        
+        Generation paths only read is_healthy, so the periodic test inference
+        never stalls a user request.
+        """
+        if self._health_thread is not None:
+            return
+        
+        def monitor():
+            while True:
+                time.sleep(self.health_check_interval)
+                self.health_check()
+        
+        self._health_thread = threading.Thread(target=monitor, name="model-health-check", daemon=True)
+        self._health_thread.start()
     
     def health_check(self):
         """Check model health with simple inference test"""
@@ -67,12 +225,18 @@ class Phi3Model:
                 logger.log_health_check(False, "Model not loaded")
                 return False
             
-            # Simple test inference
-            test_response = self.llm(
-                "<|user|>\nHello<|end|>\n<|assistant|>",
-                max_tokens=10,
-                temperature=0.1
-            )
+            # A generation in progress already proves the model works; don't queue behind it
+            if not self._llm_lock.acquire(blocking=False):
+                return self.is_healthy
+            try:
+                # Simple test inference
+                test_response = self.llm(
+                    "<|user|>\nHello<|end|>\n<|assistant|>",
+                    max_tokens=10,
+                    temperature=0.1
+                )
+            finally:
+                self._llm_lock.release()
             
             if test_response and test_response.get("choices"):
                 self.consecutive_failures = 0
@@ -97,7 +261,7 @@ class Phi3Model:
     def count_tokens(self, text):
         """Count tokens in text. Falls back to word count * 1.3 if tiktoken unavailable."""
         if self.tokenizer:
-            return len(self.tokenizer.encode(text))
+            return _count_cl100k_tokens(text)
         else:
             # Rough approximation: 1 word ≈ 1.3 tokens
             return int(len(text.split()) * 1.3)
@@ -117,12 +281,12 @@ class Phi3Model:
             logger.log_error(f"{operation}_failed", str(e), f"After {max_attempts} attempts")
             raise RuntimeError(f"{operation.capitalize()} failed after {max_attempts} attempts: {e}")
     
-    def generate(self,system_prompt, prompt, max_tokens=512, temperature=0.7, retries=1):
-        """Generate response for evaluation tasks (non-streaming)"""
+    def generate(self,system_prompt, prompt, max_tokens=512, temperature=0.7, retries=1, grammar=None):
+        """Generate response for evaluation tasks (non-streaming); grammar optionally constrains the output (LlamaGrammar)"""
         if not self.is_loaded:
             raise RuntimeError("Model not loaded. Call load_model() first.")
         
-        if not self.health_check():
+        if not self.is_healthy:
             raise RuntimeError("Model is unhealthy. Please restart the application.")
             
         formatted_prompt = f"<|system|>{system_prompt}<|end|>\n<|user|>\n{prompt}<|end|>\n<|assistant|>"
@@ -134,12 +298,14 @@ class Phi3Model:
         
         for attempt in range(retries + 1):
             try:
-                response = self.llm(
-                    formatted_prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    stop=["<|end|>"]
-                )
+                with self._llm_lock:
+                    response = self.llm(
+                        formatted_prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stop=["<|end|>"],
+                        grammar=grammar
+                    )
                 
                 if response and response.get("choices") and response["choices"][0].get("text"):
                     self.consecutive_failures = 0
@@ -151,7 +317,7 @@ class Phi3Model:
                         "evaluation", 
                         response_text, 
                         streaming=False, 
-                        tokens=self.count_tokens(response_text)
+                        tokens=response.get("usage", {}).get("completion_tokens")  # Counted by llama.cpp
                     )
                     logger.log_system_event("generation_complete", f"Response time: {response_time:.2f}s")
                     
@@ -167,7 +333,7 @@ class Phi3Model:
         if not self.is_loaded:
             raise RuntimeError("Model not loaded. Call load_model() first.")
         
-        if not self.health_check():
+        if not self.is_healthy:
             raise RuntimeError("Model is unhealthy. Please restart the application.")
             
         
@@ -175,25 +341,37 @@ class Phi3Model:
         logger.log_model_prompt("chat_streaming", prompt)
         
         try:
-            # Create streaming generator
-            stream = self.llm(
-                prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=["<|end|>"],
-                stream=True  # Enable streaming
-            )
-            
-            full_response = ""
-            print("Assistant: ", end="", flush=True)  # Print prefix
-            
-            for output in stream:
-                if output['choices'][0]['finish_reason'] is None:
-                    token = output['choices'][0]['text']
-                    full_response += token
-                    print(token, end="", flush=True)  # Stream each token
+            with self._llm_lock:
+                # Create streaming generator
+                stream = self.llm(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stop=["<|end|>"],
+                    stream=True  # Enable streaming
+                )
             
-            print()  # New line after streaming complete
+                parts = []
+                pending = []
+                print("Assistant: ", end="", flush=True)  # Print prefix
+                last_flush = time.monotonic()
+            
+                for output in stream:
+                    if output['choices'][0]['finish_reason'] is None:
+                        token = output['choices'][0]['text']
+                        parts.append(token)
+                        pending.append(token)
+                        now = time.monotonic()
+                        if (len(pending) >= STREAM_FLUSH_TOKENS or '\n' in token
+                                or now - last_flush >= STREAM_FLUSH_INTERVAL):
+                            sys.stdout.write("".join(pending))
+                            sys.stdout.flush()
+                            pending.clear()
+                            last_flush = now
+            
+            sys.stdout.write("".join(pending) + "\n")  # Rest of the reply, then a new line
+            sys.stdout.flush()
+            full_response = "".join(parts)
             self.consecutive_failures = 0
             
             # Log the complete streamed response
@@ -201,7 +379,7 @@ class Phi3Model:
                 "chat_streaming", 
                 full_response, 
                 streaming=True, 
-                tokens=self.count_tokens(full_response)
+                tokens=len(parts)  # One stream chunk per generated token
             )
             
             return full_response
@@ -227,7 +405,7 @@ class Phi3Model:
         
         # Add embedding context if available
         if embed_context:
-            prompt_parts.append("<|system|>\nYou are an assistant that answers user queries using available information. Use the information provided to respond naturally and directly. Do not mention the source of the information, do not refer to past conversations, and do not add disclaimers. Only provide clear, concise, natural answers.\n")
+            prompt_parts.append(EMBED_CONTEXT_SYSTEM_PROMPT)
             prompt_parts.append("**Available Information:**")
             for i, context in enumerate(embed_context[:3], 1):  # Top 3 similar
                 prompt_parts.append(f"{i}. User: {context['user_message']}")
@@ -236,7 +414,7 @@ class Phi3Model:
         
         # Add tool context if available
         if tool_context:
-            prompt_parts.append("<|system|>\nYou are an assistant that answers user queries using available internal data. Use the provided information to respond naturally and directly. Do not mention how you got the information, do not mention any tools, and do not add disclaimers. Only provide a natural, concise answer.\n")
+            prompt_parts.append(TOOL_CONTEXT_SYSTEM_PROMPT)
             prompt_parts.append("**Available Information:**")
             prompt_parts.append(f"Tool used: {tool_context['name']}")
             prompt_parts.append(f"Result: {tool_context['result']}")
@@ -248,49 +426,92 @@ class Phi3Model:
 
 
     def model_evaluate_tool_selection_with_confidence(self, user_query, tool):
-        """Evaluate tool selection with confidence scoring and uncertainty handling"""
+        """Evaluate a single tool selection (see model_evaluate_tool_selections_with_confidence)"""
+        return self.model_evaluate_tool_selections_with_confidence(user_query, [tool])[0]
+    
+    def model_evaluate_tool_selections_with_confidence(self, user_query, tools):
+        """
+        Evaluate several candidate tools for a query in one generation
+        
+        All candidates share one prompt, so the query and instructions are prefilled
+        once instead of once per tool.
+        
+        Args:
+            user_query: User's input query
+            tools: Candidate tool dictionaries (name, query_examples, python_function)
+            
+        Returns:
+            One evaluation dictionary (decision, confidence, reasoning, uncertainty) per tool, in order
+        """
+        if not tools:
+            return []
+        
         def animate():
             start_time = time.time()
             
-            prompt = f"""
-            You are an expert in tool relevance evaluation.
-            User query: "{user_query}"
+            candidates = "\n".join(
+                f"{i}. Name: {tool['name']}\n"
+                f"   Description: {tool['query_examples']}\n"
+                f"   Function: {tool['python_function']}"
+                for i, tool in enumerate(tools, 1)
+            )
+            prompt = f"""User query: "{user_query}"
 
-            Candidate tool:
-            - Name: {tool['name']}
-            - Description: {tool['query_examples']}
-            - Function: {tool['python_function']}
+Candidate tools:
+{candidates}
 
-            Evaluate if this tool should be used to answer the user's query.
-            
-            Respond with a JSON object containing:
-            - "decision": "true" or "false" 
-            - "confidence": a number from 0.0 to 1.0 indicating your certainty
-            - "reasoning": brief explanation of your decision
-            
-            Example: {{"decision": "true", "confidence": 0.9, "reasoning": "Tool directly matches user's request"}}
-            """
+Evaluate for each candidate tool whether it should be used to answer the user's query.
+
+Respond with a JSON array containing one object per tool, in the order listed, with:
+- "name": the tool name
+- "decision": "true" or "false"
+- "confidence": a number from 0.0 to 1.0 indicating your certainty
+- "reasoning": brief explanation of your decision (at most {TOOL_REASONING_MAX_CHARS} characters)
+
+Example: [{{"name": "{tools[0]['name']}", "decision": "true", "confidence": 0.9, "reasoning": "Tool directly matches user's request"}}]"""
 
-            raw_output = self.generate(prompt, max_tokens=200).strip()
+            try:
+                grammar = _tool_evaluation_grammar([tool['name'] for tool in tools])
+            except Exception as e:
+                grammar = None
+                logger.log_error("evaluation_grammar_failed", str(e), "Evaluating without constrained decoding")
+            
+            # The grammar bounds the output length, so the limit never truncates a valid answer
+            max_tokens = _tool_evaluation_max_chars([tool['name'] for tool in tools]) + 1
+            raw_output = self.generate(
+                TOOL_EVALUATION_SYSTEM_PROMPT, prompt, max_tokens=max_tokens, grammar=grammar
+            ).strip()
             evaluation_time = time.time() - start_time
             
             # Try to parse JSON response first
             try:
-                result = json.loads(raw_output)
-                
-                decision = result.get("decision", "").lower() == "true"
-                confidence = float(result.get("confidence", 0.5))
-                reasoning = result.get("reasoning", "No reasoning provided")
-                
-                # Validate confidence range
-                confidence = max(0.0, min(1.0, confidence))
+                parsed = json.loads(raw_output[raw_output.index('['):raw_output.rindex(']') + 1])
+                by_name = {item.get("name"): item for item in parsed if isinstance(item, dict)}
+            except ValueError:
+                by_name = {}
+                logger.log_error("evaluation_parse_failed", f"Raw output: {raw_output}")
+            
+            evaluations = []
+            for tool in tools:
+                try:
+                    result = by_name[tool['name']]
+                    decision = str(result.get("decision", "")).lower() == "true"
+                    confidence = float(result.get("confidence", 0.5))
+                    reasoning = result.get("reasoning", "No reasoning provided")
+                    
+                    # Validate confidence range
+                    confidence = max(0.0, min(1.0, confidence))
+                    
+                except (ValueError, KeyError, TypeError):
+                    # No usable entry for this tool - default to negative (conservative approach)
+                    decision, confidence, reasoning = False, 0.1, "Failed to parse JSON response"
                 
-                evaluation_result = {
+                evaluations.append({
                     "decision": decision,
                     "confidence": confidence,
                     "reasoning": reasoning,
                     "uncertainty": 1.0 - confidence
-                }
+                })
                 
                 # Log the tool evaluation with all details
                 logger.log_tool_evaluation(
@@ -301,29 +522,202 @@ class Phi3Model:
                     reasoning, 
                     evaluation_time
                 )
-                
-                return evaluation_result
-                
-            except (json.JSONDecodeError, ValueError, KeyError):
-                # JSON parsing failed - default to negative (conservative approach)
-                evaluation_result = {"decision": False, "confidence": 0.1, 
-                       "reasoning": "Failed to parse JSON response", "uncertainty": 0.9}
-                
-                # Log the failed evaluation
-                logger.log_tool_evaluation(
-                    user_query, 
-                    tool['name'], 
-                    False, 
-                    0.1, 
-                    "Failed to parse JSON response", 
-                    evaluation_time
-                )
-                logger.log_error("evaluation_parse_failed", f"Raw output: {raw_output}")
-                
-                return evaluation_result
+            
+            return evaluations
         
-        return self.animator.run_with_animation(animate, message=f"Evaluating tool usage for {tool['name']}...")
+        message = f"Evaluating tool usage for {tools[0]['name']}..." if len(tools) == 1 else f"Evaluating {len(tools)} candidate tools..."
+        return self.animator.run_with_animation(animate, message=message)
 
+    def generate_stream(self, system_prompt, prompt, max_tokens=512, temperature=0.7):
+        """Generate response for evaluation-style prompts, yielding text chunks as they arrive"""
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        if not self.is_healthy:
+            raise RuntimeError("Model is unhealthy. Please restart the application.")
+            
+        formatted_prompt = f"<|system|>{system_prompt}<|end|>\n<|user|>\n{prompt}<|end|>\n<|assistant|>"
+        
+        # Log the prompt being sent
+        logger.log_model_prompt("evaluation_streaming", prompt)
+        
+        try:
+            # Held while the caller consumes the generator; released when it finishes or is closed
+            with self._llm_lock:
+                stream = self.llm(
+                    formatted_prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stop=["<|end|>"],
+                    stream=True
+                )
+            
+                full_response = []
+                token_count = 0
+                for output in stream:
+                    token = output['choices'][0]['text']
+                    if output['choices'][0]['finish_reason'] is None:
+                        token_count += 1  # One stream chunk per generated token
+                    if token:
+                        full_response.append(token)
+                        yield token
+            
+            self.consecutive_failures = 0
+            response_text = "".join(full_response)
+            logger.log_model_response(
+                "evaluation_streaming", 
+                response_text, 
+                streaming=True, 
+                tokens=token_count
+            )
+            
+        except Exception as e:
+            self._handle_generation_error(e, 0, 1, "streaming")
+    
+    def _summary_prompts(self, messages):
+        """
+        Build the conversation text and system prompt used for summarization
+        
+        The text is a rolling window: the most recent messages that fit in
+        SUMMARY_MAX_INPUT_TOKENS.
+        
+        Args:
+            messages: List of user/assistant message dictionaries
+            
+        Returns:
+            Tuple of (summary_system_prompt, full_conversation)
+        """
+        # Build conversation text for summarization, newest first until the budget is spent
+        conversation_text = []
+        budget = SUMMARY_MAX_INPUT_TOKENS
+        for msg in reversed(messages):
+            role = msg['role'].capitalize()
+            content = msg['content'][:500]  # Limit length for processing
+            line = f"{role}: {content}"
+            budget -= self.count_tokens(line)
+            if budget < 0 and conversation_text:
+                break
+            conversation_text.append(line)
+        
+        # Back to chronological order
+        full_conversation = "\n".join(reversed(conversation_text))
+        
+        # Determine conversation size and create appropriate prompt
+        if len(messages) <= 30:
+            summary_system_prompt = (
+            "You are an assistant that summarizes conversations."
+            "Use the provided conversation information to generate a concise, single-sentence summary of the main intent and topic."
+            "Do not include punctuation, labels, emojis, formatting, or disclaimers."
+            "Do not mention tools or how information was obtained."
+            "Only output the summary sentence."
+        )
+        else:
+            summary_system_prompt = (
+            "Analyze this long conversation and provide a detailed summary "
+            "(2-3 paragraphs) highlighting key topics, important decisions, "
+            "and any unresolved questions. Output only the summary, without "
+            "punctuation, labels, or disclaimers."
+        )
+        
+        return summary_system_prompt, full_conversation
+    
+    def _generate_title(self, full_conversation):
+        """Generate and clean up a short conversation title"""
+        title_system_prompt = f"""You are an assistant that summarizes conversations. Use the provided information to generate a single concise title. Do not mention tools, sources, or past conversations. Output only the title as instructed, without labels, punctuation, or disclaimers."""
+        title_prompt = full_conversation[:1000]
+        
+        title = self.generate(title_system_prompt, title_prompt, max_tokens=30, temperature=0.3).strip()
+        # Clean up title (remove quotes, extra text, and common AI additions)
+        title = title.replace('"', '').replace("'", "").strip()
+        
+        # Remove "Title:" if it appears (common AI response pattern)
+        if title.lower().startswith('title:'):
+            title = title[6:].strip()
+        if title.lower().endswith(' title:'):
+            title = title[:-7].strip()
+        
+        # Remove everything after opening parentheses (common AI explanations)
+        if '(' in title:
+            title = title.split('(')[0].strip()
+        
+        # Remove everything after "Note:" or similar
+        if 'note:' in title.lower():
+            title = title.split('note:')[0].strip()
+        
+        # Remove trailing colons or periods
+        title = title.rstrip(':.')
+        
+        # Limit to 5 words max as requested
+        words = title.split()
+        if len(words) > 5:
+            title = ' '.join(words[:5])
+        
+        # Final length check and fallback
+        if len(title) > 50:
+            title = title[:47] + "..."
+        
+        # Fallback if title is empty after cleanup
+        if not title.strip():
+            title = "Conversation Summary"
+        
+        return title
+    
+    def summarize_conversation_stream(self, conversation_data):
+        """
+        Stream the conversation summary text as it is generated
+        
+        Join the yielded chunks and pass them to finish_conversation_summary
+        to get the title and tool usage summary.
+        
+        Args:
+            conversation_data: Dictionary with messages and tool usage
+            
+        Yields:
+            Summary text chunks
+        """
+        messages = conversation_data.get('messages', [])
+        if not messages:
+            yield 'No messages found in this conversation.'
+            return
+        
+        summary_system_prompt, full_conversation = self._summary_prompts(messages)
+        yield from self.generate_stream(summary_system_prompt, full_conversation, max_tokens=300, temperature=0.5)
+    
+    def finish_conversation_summary(self, conversation_data, summary):
+        """
+        Complete a streamed summary with a title and tool usage summary
+        
+        Args:
+            conversation_data: Dictionary with messages and tool usage
+            summary: Summary text produced by summarize_conversation_stream
+            
+        Returns:
+            Dictionary with title, summary, and tool_usage_summary
+        """
+        messages = conversation_data.get('messages', [])
+        tools_used = conversation_data.get('tools_used', [])
+        
+        if not messages:
+            return {
+                'title': 'Empty Conversation',
+                'summary': 'No messages found in this conversation.',
+                'tool_usage_summary': 'No tools were used.'
+            }
+        
+        _, full_conversation = self._summary_prompts(messages)
+        title = self._generate_title(full_conversation)
+        
+        # Generate tool usage summary
+        tool_summary = "No tools were used."
+        if tools_used:
+            tool_summary = ', '.join(tool.get('name', 'Unknown') for tool in tools_used)
+        
+        return {
+            'title': title,
+            'summary': summary.strip(),
+            'tool_usage_summary': tool_summary.strip()
+        }
+    
     def summarize_conversation(self, conversation_data):
         """
         Generate comprehensive conversation summary with title and tool usage
@@ -336,97 +730,13 @@ class Phi3Model:
         """
         try:
             messages = conversation_data.get('messages', [])
-            tools_used = conversation_data.get('tools_used', [])
-            
             if not messages:
-                return {
-                    'title': 'Empty Conversation',
-                    'summary': 'No messages found in this conversation.',
-                    'tool_usage_summary': 'No tools were used.'
-                }
-            
-            # Build conversation text for summarization
-            conversation_text = []
-            for msg in messages:
-                role = msg['role'].capitalize()
-                content = msg['content'][:500]  # Limit length for processing
-                conversation_text.append(f"{role}: {content}")
-            
-            full_conversation = "\n".join(conversation_text)
-            
-            # Determine conversation size and create appropriate prompt
-            message_count = len(messages)
-            if message_count <= 30:
-                summary_system_prompt = (
-                "You are an assistant that summarizes conversations."
-                "Use the provided conversation information to generate a concise, single-sentence summary of the main intent and topic."
-                "Do not include punctuation, labels, emojis, formatting, or disclaimers."
-                "Do not mention tools or how information was obtained."
-                "Only output the summary sentence."
-            )
-            else:
-                summary_system_prompt = (
-                "Analyze this long conversation and provide a detailed summary "
-                "(2-3 paragraphs) highlighting key topics, important decisions, "
-                "and any unresolved questions. Output only the summary, without "
-                "punctuation, labels, or disclaimers."
-            )
+                return self.finish_conversation_summary(conversation_data, '')
             
+            summary_system_prompt, full_conversation = self._summary_prompts(messages)
             summary = self.generate(summary_system_prompt, full_conversation, max_tokens=300, temperature=0.5)
             
-            # Generate conversation title
-            title_system_prompt = f"""You are an assistant that summarizes conversations. Use the provided information to generate a single concise title. Do not mention tools, sources, or past conversations. Output only the title as instructed, without labels, punctuation, or disclaimers."""
-            title_prompt = full_conversation[:1000]
-            
-            title = self.generate(title_system_prompt, title_prompt, max_tokens=30, temperature=0.3).strip()
-            # Clean up title (remove quotes, extra text, and common AI additions)
-            title = title.replace('"', '').replace("'", "").strip()
-            
-            # Remove "Title:" if it appears (common AI response pattern)
-            if title.lower().startswith('title:'):
-                title = title[6:].strip()
-            if title.lower().endswith(' title:'):
-                title = title[:-7].strip()
-            
-            # Remove everything after opening parentheses (common AI explanations)
-            if '(' in title:
-                title = title.split('(')[0].strip()
-            
-            # Remove everything after "Note:" or similar
-            if 'note:' in title.lower():
-                title = title.split('note:')[0].strip()
-            
-            # Remove trailing colons or periods
-            title = title.rstrip(':.')
-            
-            # Limit to 5 words max as requested
-            words = title.split()
-            if len(words) > 5:
-                title = ' '.join(words[:5])
-            
-            # Final length check and fallback
-            if len(title) > 50:
-                title = title[:47] + "..."
-            
-            # Fallback if title is empty after cleanup
-            if not title.strip():
-                title = "Conversation Summary"
-            
-            # Generate tool usage summary
-            tool_summary = "No tools were used."
-            if tools_used:
-                tools_id = []
-                for tool in tools_used:
-                    tools_id.append(tool.get('name', 'Unknown'))
-
-            if tools_id:
-                tool_summary = ', '.join(tools_id)
-            
-            return {
-                'title': title,
-                'summary': summary.strip(),
-                'tool_usage_summary': tool_summary.strip()
-            }
+            return self.finish_conversation_summary(conversation_data, summary)
             
         except Exception as e:
             logger.log_error("conversation_summarization_failed", str(e), "Failed to summarize conversation")
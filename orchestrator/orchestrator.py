@@ -18,6 +18,7 @@ class Orchestrator:
         # Load Model
         self.model = Phi3Model();
         self.model.load_model();
+        self.model.warmup();
 
         # Initialize tool embeddings manager
         self.tool_embeddings = ToolEmbeddingManager()
@@ -50,6 +51,9 @@ class Orchestrator:
         )
 
         logger.log_system_event("session_started", "Orchestrator initialized and ready")
+    
+    def run(self):
+        """Run the interactive chat loop until the user exits"""
         print("🤖 Local Assistant Ready! Type 'help' for commands or ask me anything.")
         
         while True:
@@ -208,4 +212,6 @@ class Orchestrator:
                 return "Response generation failed"
     
 
-orchestrator = Orchestrator();
\ No newline at end of file
+if __name__ == "__main__":
+    orchestrator = Orchestrator()
+    orchestrator.run()
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script to verify message index delta log appends and replay, including torn tails.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from embeddings.base import delta_log
+
+DIMENSION = 4
+
+
+def make_batch(first_id, count):
+    """Vectors and mapping rows for messages first_id .. first_id + count - 1"""
+    ids = range(first_id, first_id + count)
+    vectors = np.array([[i, i + 0.5, -i, 1.0] for i in ids], dtype=np.float32)
+    rows = [{'id': i, 'role': 'user', 'content': f"message {i}"} for i in ids]
+    return vectors, rows
+
+def test_round_trip():
+    """Test that appended batches replay in order"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "delta.log"
+            first_vectors, first_rows = make_batch(1, 3)
+            second_vectors, second_rows = make_batch(4, 2)
+            delta_log.append_records(path, first_vectors, first_rows)
+            delta_log.append_records(path, second_vectors, second_rows)
+
+            vectors, rows, valid_length = delta_log.read_records(path, DIMENSION)
+            assert rows == first_rows + second_rows
+            assert np.array_equal(vectors, np.vstack([first_vectors, second_vectors]))
+            assert valid_length == path.stat().st_size
+            assert not delta_log.truncate_to(path, valid_length)
+        print("✅ Appended batches replay in order")
+        return True
+    except Exception as e:
+        print(f"❌ Round trip test error: {e}")
+        return False
+
+def test_torn_tail():
+    """Test that a partial trailing record is discarded and later appends stay aligned"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "delta.log"
+            vectors, rows = make_batch(1, 2)
+            delta_log.append_records(path, vectors, rows)
+
+            # Simulate a write cut off halfway through the next batch
+            torn = delta_log.encode_records(*make_batch(3, 2))
+            with open(path, 'ab') as f:
+                f.write(torn[:len(torn) // 2])
+
+            replayed_vectors, replayed_rows, valid_length = delta_log.read_records(path, DIMENSION)
+            assert replayed_rows == rows
+            assert np.array_equal(replayed_vectors, vectors)
+            assert delta_log.truncate_to(path, valid_length)
+            assert path.stat().st_size == valid_length
+
+            # The next append starts on a record boundary
+            next_vectors, next_rows = make_batch(3, 2)
+            delta_log.append_records(path, next_vectors, next_rows)
+            replayed_vectors, replayed_rows, _ = delta_log.read_records(path, DIMENSION)
+            assert [row['id'] for row in replayed_rows] == [1, 2, 3, 4]
+            assert np.array_equal(replayed_vectors, np.vstack([vectors, next_vectors]))
+        print("✅ Torn tail discarded; later appends stay aligned")
+        return True
+    except Exception as e:
+        print(f"❌ Torn tail test error: {e}")
+        return False
+
+def test_corrupt_record():
+    """Test that replay stops at a record whose checksum does not match"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "delta.log"
+            delta_log.append_records(path, *make_batch(1, 1))
+            intact_length = path.stat().st_size
+            delta_log.append_records(path, *make_batch(2, 2))
+
+            # Flip one byte inside the second record's vector
+            data = bytearray(path.read_bytes())
+            data[intact_length + delta_log.RECORD_HEADER.size] ^= 0xFF
+            path.write_bytes(bytes(data))
+
+            vectors, rows, valid_length = delta_log.read_records(path, DIMENSION)
+            assert [row['id'] for row in rows] == [1]
+            assert vectors.shape == (1, DIMENSION)
+            assert valid_length == intact_length
+        print("✅ Replay stops at a corrupt record")
+        return True
+    except Exception as e:
+        print(f"❌ Corrupt record test error: {e}")
+        return False
+
+def test_empty_and_mismatched():
+    """Test an empty log and a batch whose vectors and rows disagree"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "delta.log"
+            path.write_bytes(b"")
+            vectors, rows, valid_length = delta_log.read_records(path, DIMENSION)
+            assert vectors.shape == (0, DIMENSION) and rows == [] and valid_length == 0
+
+            batch_vectors, batch_rows = make_batch(1, 2)
+            try:
+                delta_log.append_records(path, batch_vectors, batch_rows[:1])
+                raise AssertionError("mismatched batch was accepted")
+            except ValueError:
+                pass
+            assert path.stat().st_size == 0
+        print("✅ Empty log and mismatched batch handled")
+        return True
+    except Exception as e:
+        print(f"❌ Empty/mismatched test error: {e}")
+        return False
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing Message Index Delta Log...")
+    print("=" * 50)
+
+    tests = [
+        ("Round Trip", test_round_trip),
+        ("Torn Tail", test_torn_tail),
+        ("Corrupt Record", test_corrupt_record),
+        ("Empty And Mismatched", test_empty_and_mismatched),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n🔍 Running {test_name}...")
+        if test_func():
+            passed += 1
+        else:
+            print(f"❌ {test_name} failed!")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All tests passed! Delta log works as expected!")
+        return 0
+    else:
+        print("💥 Some tests failed. Please check the implementation.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
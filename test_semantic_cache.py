@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the semantic search cache (LRU eviction, TTL and parameter keys).
+"""
+
+import sys
+import os
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from embeddings.base.semantic_cache import SemanticCache
+
+DIMENSION = 8
+
+
+def unit_vector(i, noise=0.0):
+    """Query vector along axis i, optionally nudged towards the next axis"""
+    vector = np.zeros((1, DIMENSION), dtype=np.float32)
+    vector[0, i] = 1.0
+    vector[0, (i + 1) % DIMENSION] = noise
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_hit_returns_copies():
+    """Test that cached results are returned as copies"""
+    try:
+        cache = SemanticCache(dimension=DIMENSION)
+        cache.put(unit_vector(0), [{'id': 1}], "k=5")
+
+        results = cache.get(unit_vector(0), "k=5")
+        assert results == [{'id': 1}], results
+        results[0]['id'] = 99
+        assert cache.get(unit_vector(0), "k=5") == [{'id': 1}]
+        assert cache.hits == 2 and cache.misses == 0
+        print("✅ Exact hits return copies of the cached results")
+        return True
+    except Exception as e:
+        print(f"❌ Exact hit test error: {e}")
+        return False
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted on overflow"""
+    try:
+        cache = SemanticCache(dimension=DIMENSION, maxsize=2)
+        cache.put(unit_vector(0), [{'id': 0}])
+        cache.put(unit_vector(1), [{'id': 1}])
+
+        # Touch the first entry so the second becomes least recently used
+        assert cache.get(unit_vector(0)) is not None
+        cache.put(unit_vector(2), [{'id': 2}])
+
+        assert len(cache) == 2
+        assert cache.get(unit_vector(0)) == [{'id': 0}]
+        assert cache.get(unit_vector(1)) is None
+        assert cache.get(unit_vector(2)) == [{'id': 2}]
+        print("✅ Least recently used entry evicted")
+        return True
+    except Exception as e:
+        print(f"❌ LRU eviction test error: {e}")
+        return False
+
+def test_ttl_expiry():
+    """Test that entries expire after ttl_seconds"""
+    try:
+        cache = SemanticCache(dimension=DIMENSION, ttl_seconds=0.05)
+        cache.put(unit_vector(0), [{'id': 0}])
+        assert cache.get(unit_vector(0)) == [{'id': 0}]
+
+        time.sleep(0.1)
+        assert cache.get(unit_vector(0)) is None
+        assert len(cache) == 0
+        print("✅ Expired entries are dropped")
+        return True
+    except Exception as e:
+        print(f"❌ TTL expiry test error: {e}")
+        return False
+
+def test_params_key():
+    """Test that exact and near-duplicate hits require the same search parameters"""
+    try:
+        cache = SemanticCache(dimension=DIMENSION, min_similarity=0.97)
+        cache.put(unit_vector(0), [{'id': 0}], "k=5")
+
+        assert cache.get(unit_vector(0), "k=10") is None
+        assert cache.get(unit_vector(0, noise=0.1), "k=5") == [{'id': 0}]
+        assert cache.get(unit_vector(0, noise=0.1), "k=10") is None
+
+        # Too dissimilar to count as the same query
+        assert cache.get(unit_vector(0, noise=1.0), "k=5") is None
+        print("✅ Parameter keys separate cached searches")
+        return True
+    except Exception as e:
+        print(f"❌ Params key test error: {e}")
+        return False
+
+def test_clear():
+    """Test that clear drops exact and near-duplicate entries"""
+    try:
+        cache = SemanticCache(dimension=DIMENSION)
+        cache.put(unit_vector(0), [{'id': 0}])
+        cache.put(unit_vector(1), [{'id': 1}])
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.get(unit_vector(0)) is None
+        assert cache.get(unit_vector(1, noise=0.1)) is None
+
+        cache.put(unit_vector(2), [{'id': 2}])
+        assert cache.get(unit_vector(2, noise=0.1)) == [{'id': 2}]
+        print("✅ Cleared cache serves nothing stale")
+        return True
+    except Exception as e:
+        print(f"❌ Clear test error: {e}")
+        return False
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing Semantic Cache...")
+    print("=" * 50)
+
+    tests = [
+        ("Exact Hits", test_exact_hit_returns_copies),
+        ("LRU Eviction", test_lru_eviction),
+        ("TTL Expiry", test_ttl_expiry),
+        ("Params Key", test_params_key),
+        ("Clear", test_clear),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"\n🔍 Running {test_name}...")
+        if test_func():
+            passed += 1
+        else:
+            print(f"❌ {test_name} failed!")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All tests passed! Semantic cache works as expected!")
+        return 0
+    else:
+        print("💥 Some tests failed. Please check the implementation.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ Handles persistent storage of conversations and messages in PostgreSQL
 """
 
 import json
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
@@ -16,11 +17,21 @@ class ConversationHistoryManager:
     Manages persistent conversation history in PostgreSQL database
     """
     
+    # Seconds an analytics result stays valid when no writes happened in this process
+    ANALYTICS_CACHE_TTL = 30
+    
+    # Characters of each message the summarizer reads (see Model._summary_prompts)
+    SUMMARY_MESSAGE_CHARS = 500
+    
     def __init__(self, session_id: Optional[str] = None):
         self.session_id = session_id or str(uuid.uuid4())
         self.current_conversation_id: Optional[int] = None
         self.current_sequence_number = 0
         
+        # Bumped on every insert so cached analytics are invalidated immediately
+        self.messages_version = 0
+        self._analytics_cache: Optional[Tuple[int, float, Dict[str, Any]]] = None
+        
     def start_new_conversation(self, title: str = "Untitled Conversation", metadata: Optional[Dict] = None) -> int:
         """
         Start a new conversation and return its ID
@@ -46,6 +57,7 @@ class ConversationHistoryManager:
                 conversation_id = result[0][0]
                 self.current_conversation_id = conversation_id
                 self.current_sequence_number = 0
+                self.messages_version += 1
                 
                 logger.log_system_event(
                     "conversation_started", 
@@ -121,6 +133,7 @@ class ConversationHistoryManager:
             
             if result and len(result) > 0:
                 message_id = result[0][0]
+                self.messages_version += 1
                 
                 logger.log_system_event(
                     "message_stored", 
@@ -135,16 +148,22 @@ class ConversationHistoryManager:
             logger.log_error("message_store_failed", str(e), "Failed to store message")
             raise
     
-    def get_conversation_history(self, conversation_id: Optional[int] = None, limit: int = 100) -> List[Dict]:
+    def get_conversation_history(self, 
+                                 conversation_id: Optional[int] = None, 
+                                 limit: int = 100,
+                                 offset: int = 0,
+                                 preview_len: Optional[int] = None) -> List[Dict]:
         """
         Retrieve conversation history
         
         Args:
             conversation_id: Specific conversation ID (uses current if None)
             limit: Maximum number of messages to retrieve
+            offset: Number of messages to skip (for pagination)
+            preview_len: Truncate content to this many characters in SQL (None = full content)
             
         Returns:
-            List of message dictionaries
+            List of message dictionaries ('truncated' is True when content was cut)
         """
         target_conversation_id = conversation_id or self.current_conversation_id
         
@@ -152,17 +171,31 @@ class ConversationHistoryManager:
             return []
         
         try:
-            query_sql = """
+            # Truncate on the server so long messages are never shipped in full
+            if preview_len is not None:
+                content_sql = "LEFT(m.content, %s)"
+                truncated_sql = "LENGTH(m.content) > %s"
+                preview_params = (preview_len, preview_len)
+            else:
+                content_sql = "m.content"
+                truncated_sql = "FALSE"
+                preview_params = ()
+            
+            query_sql = f"""
                 SELECT 
-                    m.id, m.role, m.content, m.tool_name, m.tool_result, m.tool_id,
-                    m.is_correction, m.sequence_number, m.created_at, m.metadata
+                    m.id, m.role, {content_sql}, m.tool_name, m.tool_result, m.tool_id,
+                    m.is_correction, m.sequence_number, m.created_at, m.metadata,
+                    {truncated_sql}
                 FROM messages m
                 WHERE m.conversation_id = %s
                 ORDER BY m.sequence_number ASC
-                LIMIT %s
+                LIMIT %s OFFSET %s
             """
             
-            result = db_manager.execute_query(query_sql, (target_conversation_id, limit))
+            result = db_manager.execute_query(
+                query_sql, 
+                preview_params + (target_conversation_id, limit, offset)
+            )
             
             messages = []
             for row in result:
@@ -176,7 +209,8 @@ class ConversationHistoryManager:
                     'is_correction': row[6],
                     'sequence_number': row[7],
                     'created_at': row[8].isoformat() if row[8] else None,
-                    'metadata': row[9] if row[9] else {}  # JSONB is already a Python dict
+                    'metadata': row[9] if row[9] else {},  # JSONB is already a Python dict
+                    'truncated': bool(row[10])
                 }
                 messages.append(message)
             
@@ -340,9 +374,17 @@ class ConversationHistoryManager:
         """
         Get analytics about conversation patterns
         
+        Results are cached for ANALYTICS_CACHE_TTL seconds and invalidated as soon
+        as this manager inserts a conversation or message.
+        
         Returns:
             Analytics dictionary
         """
+        if self._analytics_cache:
+            version, cached_at, analytics = self._analytics_cache
+            if version == self.messages_version and time.monotonic() - cached_at < self.ANALYTICS_CACHE_TTL:
+                return dict(analytics)
+        
         try:
             analytics_sql = """
                 SELECT 
@@ -365,7 +407,7 @@ class ConversationHistoryManager:
             
             if result and len(result) > 0:
                 row = result[0]
-                return {
+                analytics = {
                     'total_conversations': row[0] or 0,
                     'total_messages': row[1] or 0,
                     'avg_messages_per_conversation': float(row[2] or 0),
@@ -373,6 +415,8 @@ class ConversationHistoryManager:
                     'correction_messages': row[4] or 0,
                     'session_id': self.session_id
                 }
+                self._analytics_cache = (self.messages_version, time.monotonic(), analytics)
+                return dict(analytics)
             
             return {}
             
@@ -431,27 +475,51 @@ class ConversationHistoryManager:
             logger.log_error("exchange_processing_failed", str(e), "Failed to process conversation exchange")
             raise
     
-    def get_conversation_for_summary(self, conversation_id: int) -> Dict:
+    def get_conversation_for_summary(self, conversation_id: int, max_chars: Optional[int] = None) -> Dict:
         """
-        Get complete conversation data for summarization
+        Get conversation data for summarization
         
         Args:
             conversation_id: ID of conversation to retrieve
+            max_chars: Character budget for message content; when set, the newest
+                messages are returned until the budget is reached, always including
+                the message that crosses it (None = all messages)
             
         Returns:
             Dictionary with messages and tool usage
         """
         try:
-            # Get conversation messages
-            query = """
-                SELECT id, role, content, tool_name, tool_result, created_at
-                FROM messages
-                WHERE conversation_id = %s
-                AND role IN ('user', 'assistant', 'tool')
-                ORDER BY sequence_number ASC
-            """
-            
-            result = db_manager.execute_query(query, (conversation_id,))
+            if max_chars is None:
+                query = """
+                    SELECT id, role, content, tool_name, tool_result, created_at
+                    FROM messages
+                    WHERE conversation_id = %s
+                    AND role IN ('user', 'assistant', 'tool')
+                    ORDER BY sequence_number ASC
+                """
+                params = (conversation_id,)
+            else:
+                # Budget on the server: running total of the content the summarizer
+                # reads, newest first; a row is kept if the budget was not spent before it
+                query = """
+                    SELECT id, role, content, tool_name, tool_result, created_at
+                    FROM (
+                        SELECT id, role, content, tool_name, tool_result, created_at, sequence_number,
+                               LEAST(LENGTH(COALESCE(content, '')), %s) AS counted_chars,
+                               SUM(LEAST(LENGTH(COALESCE(content, '')), %s)) OVER (
+                                   ORDER BY sequence_number DESC
+                                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                               ) AS running_chars
+                        FROM messages
+                        WHERE conversation_id = %s
+                        AND role IN ('user', 'assistant', 'tool')
+                    ) budgeted
+                    WHERE running_chars - counted_chars < %s
+                    ORDER BY sequence_number ASC
+                """
+                params = (self.SUMMARY_MESSAGE_CHARS, self.SUMMARY_MESSAGE_CHARS, conversation_id, max_chars)
+            
+            result = db_manager.execute_query(query, params)
             
             messages = []
             tools_used = []
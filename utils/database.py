@@ -15,15 +15,15 @@ class DatabaseManager:
     """Manages database connections with pooling"""
     
     def __init__(self):
-        self.pool: Optional[pool.SimpleConnectionPool] = None
+        self.pool: Optional[pool.ThreadedConnectionPool] = None
         self._initialize_pool()
     
     def _initialize_pool(self):
-        """Initialize connection pool"""
+        """Initialize thread-safe connection pool (shared by background index workers)"""
         try:
-            self.pool = pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=10,
+            self.pool = pool.ThreadedConnectionPool(
+                minconn=config.database.min_connections,
+                maxconn=config.database.max_connections,
                 host=config.database.host,
                 port=config.database.port,
                 database=config.database.database,